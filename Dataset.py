@@ -1,6 +1,356 @@
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
 import pandas as pd
 
 file_path = "./Data/health_lifestyle.csv"
-df = pd.read_csv(file_path)
 
-df.info(), df.head()
+YES_NO = pd.CategoricalDtype(["No", "Yes"])
+
+# Declared column types for health_lifestyle.csv. Columns not listed here are
+# left to pandas' own inference. Read files through read_csv(), which also
+# applies INTEGER_FALLBACK and CATEGORY_ORDER.
+SCHEMA = {
+    "ID": "int32",
+    "Age": "int8",
+    "Gender": "category",
+    "Height_cm": "int16",
+    "Weight_kg": "int16",
+    "BMI": "float32",
+    "Daily_Steps": "int32",
+    "Calories_Intake": "int16",
+    "Hours_of_Sleep": "float32",
+    "Heart_Rate": "int16",
+    "Blood_Pressure": "category",
+    "Exercise_Hours_per_Week": "float32",
+    "Smoker": YES_NO,
+    "Alcohol_Consumption_per_Week": "int8",
+    "Diabetic": YES_NO,
+    "Heart_Disease": YES_NO,
+}
+# Integer columns are parsed as float64, so a missing value does not fail the
+# load. A column is then narrowed to its SCHEMA type when every value is an
+# integer in range, and otherwise kept as these floats, NaN where missing.
+INTEGER_FALLBACK = {"int8": "float32", "int16": "float32", "int32": "float64"}
+# Open categories list these values first, in this order, whether or not
+# they occur, so charts keep their colours; other values follow sorted.
+CATEGORY_ORDER = {"Gender": ["Male", "Female"]}
+
+# The cache is a directory next to the CSV holding one .npy file per column
+# (string columns are stored as category codes) plus a meta.json describing
+# the source file it was built from. Numeric columns are memory-mapped back.
+CACHE_SUFFIX = ".cache"
+CACHE_META = "meta.json"
+
+
+def cache_dir(path):
+    return path + CACHE_SUFFIX
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def schema_signature():
+    return {name: repr((dtype, CATEGORY_ORDER.get(name))) for name, dtype in SCHEMA.items()}
+
+
+def _is_integer(dtype):
+    return isinstance(dtype, str) and dtype in INTEGER_FALLBACK
+
+
+def read_dtypes():
+    # The dtype= to parse with; apply_schema() finishes the job
+    return {name: "float64" if _is_integer(dtype) else dtype for name, dtype in SCHEMA.items()}
+
+
+def apply_schema(frame):
+    for name in frame.columns:
+        dtype = SCHEMA.get(name)
+        values = frame[name]
+        if _is_integer(dtype):
+            info = np.iinfo(dtype)
+            fits = values.notna().all() and values.between(info.min, info.max).all() and (values % 1 == 0).all()
+            frame[name] = values.astype(dtype if fits else INTEGER_FALLBACK[dtype])
+        elif name in CATEGORY_ORDER:
+            order = CATEGORY_ORDER[name]
+            frame[name] = values.cat.set_categories(order + sorted(set(values.cat.categories) - set(order)))
+    return frame
+
+
+def read_csv(source, **kwargs):
+    # pd.read_csv with SCHEMA applied
+    return apply_schema(pd.read_csv(source, dtype=read_dtypes(), **kwargs))
+
+
+def memory_report(frame):
+    # "before" is what the same frame costs with pandas' default dtypes:
+    # 8 bytes per numeric cell and a Python str object per categorical cell.
+    before = 0
+    for name in frame.columns:
+        series = frame[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            counts = series.value_counts(sort=False)
+            before += 8 * len(series) + sum(
+                count * sys.getsizeof(str(value)) for value, count in counts.items())
+        else:
+            before += 8 * len(series)
+    after = int(frame.memory_usage(deep=True, index=False).sum())
+    return before, after
+
+
+def print_memory_report(frame):
+    before, after = memory_report(frame)
+    print(f"Dataset: {len(frame)} rows x {len(frame.columns)} columns, {before / 1e6:.2f} MB with default dtypes "
+          f"-> {after / 1e6:.2f} MB with schema ({after / max(before, 1):.0%})")
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, CACHE_META)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(meta, path):
+    return (meta is not None and meta.get("source") == source_signature(path)
+            and meta.get("schema") == schema_signature())
+
+
+def write_cache(frame, path):
+    directory = cache_dir(path)
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        entry = {"name": name, "file": f"{len(columns)}.npy"}
+        if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.astype("category")
+            entry["categories"] = [str(c) for c in values.cat.categories]
+            entry["ordered"] = bool(values.cat.ordered)
+            data = values.cat.codes.to_numpy()
+        else:
+            data = series.to_numpy()
+        np.save(os.path.join(tmp_dir, entry["file"]), data)
+        columns.append(entry)
+
+    meta = {"source": source_signature(path), "schema": schema_signature(),
+            "rows": len(frame), "columns": columns}
+    with open(os.path.join(tmp_dir, CACHE_META), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return meta
+
+
+def ensure_cache(path):
+    meta = _read_meta(cache_dir(path))
+    if _is_fresh(meta, path):
+        return meta
+    return write_cache(read_csv(path), path)
+
+
+def read_cache(path, columns=None, meta=None):
+    directory = cache_dir(path)
+    if meta is None:
+        meta = _read_meta(directory)
+        if not _is_fresh(meta, path):
+            return None
+
+    entries = {entry["name"]: entry for entry in meta["columns"]}
+    names = list(entries) if columns is None else list(columns)
+    data = {}
+    for name in names:
+        entry = entries[name]
+        # mmap_mode="c" maps the file copy-on-write, so in-place edits stay in memory
+        values = np.load(os.path.join(directory, entry["file"]), mmap_mode="c")
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, entry["categories"], ordered=entry["ordered"])
+        data[name] = values
+    return pd.DataFrame(data, columns=names, copy=False)
+
+
+def load_dataset(path=file_path, columns=None, use_cache=True):
+    if use_cache:
+        try:
+            return read_cache(path, columns, ensure_cache(path))
+        except OSError:
+            pass
+    return read_csv(path, usecols=columns)
+
+
+def read_tail(path, offset, columns):
+    # Complete lines written after byte `offset`, and the offset just past them.
+    # A line still being written is left for the next call.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return pd.DataFrame(columns=columns), offset
+    return read_csv(io.BytesIO(data[:end]), names=columns, header=None), offset + end
+
+
+def offset_after_rows(path, rows):
+    # Byte offset just past the header line and the first `rows` data lines
+    remaining = rows + 1
+    offset = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count = block.count(b"\n")
+            if count < remaining:
+                remaining -= count
+                offset += len(block)
+                continue
+            index = -1
+            for _ in range(remaining):
+                index = block.index(b"\n", index + 1)
+            return offset + index + 1
+    return offset
+
+
+def column_names(path=file_path):
+    try:
+        return [entry["name"] for entry in ensure_cache(path)["columns"]]
+    except OSError:
+        return list(pd.read_csv(path, nrows=0).columns)
+
+
+# Only the columns someone has asked for so far are held in memory;
+# get_df() reads any missing ones from the column cache and keeps them, and
+# append_tail() extends them with rows appended to the CSV since.
+_lock = threading.RLock()
+_state = {"path": file_path, "columns": None, "loaded": {}, "offset": None, "signature": None}
+version = 0
+
+
+def _frame_of(series_by_name, names):
+    return pd.DataFrame({name: series_by_name[name] for name in names}, columns=names, copy=False)
+
+
+def source_path():
+    with _lock:
+        return _state["path"]
+
+
+def all_columns():
+    with _lock:
+        if _state["columns"] is None:
+            _state["columns"] = column_names(_state["path"])
+        return list(_state["columns"])
+
+
+def get_df(columns=None):
+    with _lock:
+        wanted = all_columns() if columns is None else list(columns)
+
+        loaded = _state["loaded"]
+        missing = [name for name in wanted if name not in loaded]
+        if missing:
+            rows = _loaded_rows()
+            if rows is None:
+                # The file as it was when the data in memory was first read
+                _state["signature"] = source_signature(_state["path"])
+            added = load_dataset(_state["path"], missing)
+            if rows is not None and len(added) > rows:
+                # The file grew since the other columns were read; the new
+                # rows arrive through append_tail()
+                added = added.iloc[:rows]
+            for name in missing:
+                loaded[name] = added[name]
+
+        return _frame_of(loaded, wanted)
+
+
+def loaded_columns():
+    with _lock:
+        return [name for name in all_columns() if name in _state["loaded"]]
+
+
+def loaded_state():
+    # Identifies the data in memory: the CSV, its signature when first read
+    # and the number of rows held since, appended ones included. None while
+    # nothing is loaded.
+    with _lock:
+        rows = _loaded_rows()
+        if rows is None:
+            return None
+        return {"path": os.path.abspath(_state["path"]), "source": _state["signature"], "rows": rows}
+
+
+def _loaded_rows():
+    for series in _state["loaded"].values():
+        return len(series)
+    return None
+
+
+def _append_column(series, tail):
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.dtype != tail.dtype:
+        values = pd.api.types.union_categoricals([series.array, tail.array])
+        return pd.Series(values, index=pd.RangeIndex(len(values)), name=series.name)
+    return pd.concat([series, tail])
+
+
+def append_tail():
+    # Extends the loaded columns with the rows appended to the CSV since it
+    # was read, and bumps the version if there were any. Returns the new rows
+    # (every column, indexed after the existing ones), or None when the data
+    # has to be reloaded instead: nothing was loaded yet, or the file shrank.
+    global version
+    with _lock:
+        rows = _loaded_rows()
+        path = _state["path"]
+        if rows is None:
+            reload()
+            return None
+        if _state["offset"] is None:
+            _state["offset"] = offset_after_rows(path, rows)
+        if os.path.getsize(path) < _state["offset"]:
+            reload()
+            return None
+
+        tail, offset = read_tail(path, _state["offset"], all_columns())
+        if tail.empty:
+            return tail
+        tail.index = pd.RangeIndex(rows, rows + len(tail))
+        loaded = _state["loaded"]
+        for name in loaded:
+            loaded[name] = _append_column(loaded[name], tail[name])
+        _state["offset"] = offset
+        version += 1
+        return tail
+
+
+def reload(path=None):
+    global version
+    with _lock:
+        if path is not None:
+            _state["path"] = path
+        _state["columns"] = None
+        _state["loaded"] = {}
+        _state["offset"] = None
+        _state["signature"] = None
+        version += 1
+
+
+def __getattr__(name):
+    # Keeps "from Dataset import df" working; it now means the full frame.
+    if name == "df":
+        return get_df()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    # Memory footprint of the whole dataset with SCHEMA applied
+    print_memory_report(get_df())
@@ -1,13 +1,209 @@
 import sys
 import os
+import math
+import time
+from collections import OrderedDict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QPushButton, QLabel, 
                             QVBoxLayout, QHBoxLayout, QScrollArea, QSplitter, QFrame, 
-                            QMessageBox, QDialog, QTextEdit, QStackedWidget)
-from PyQt5.QtCore import Qt, QSize, QTimer
+                            QMessageBox, QDialog, QTextEdit, QStackedWidget, QProgressBar, QFileDialog,
+                            QCheckBox, QDoubleSpinBox, QGridLayout)
+from PyQt5.QtCore import Qt, QSize, QTimer, QObject, QRunnable, QThreadPool, QFileSystemWatcher, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon, QColor, QPalette, QPixmap
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-import visualization as vis
+import instrumentation
+import registry
+# Figures are built on a worker thread and only attached to a Qt canvas
+# afterwards, so pyplot itself must not create Qt windows. Set through the
+# environment so it holds whichever thread imports matplotlib first.
+os.environ["MPLBACKEND"] = "Agg"
+# matplotlib, pandas, seaborn and the dataset modules are imported by
+# StartupTask on the render thread once the window is up, so nothing here
+# waits for them. Methods that run after startup import them locally, which
+# is then just a lookup.
+
+FIGURE_CACHE_SIZE = 8
+# Writers append in bursts; wait for the file to settle before reading the tail
+RELOAD_DEBOUNCE_MS = 500
+# In live mode the CSV is polled this often, and the histograms and the
+# dashboard take new rows in place (see live.py)
+LIVE_INTERVAL_MS = 1000
+# While a chart is on screen, the other charts of its open sidebar section
+# are prepared in the background, one task at a time: their columns and
+# aggregates always, the finished figure for the next few cheap ones.
+PREFETCH_IDLE_MS = 400
+PREFETCH_FIGURES = 3
+PREFETCH_MEMORY_BUDGET = 256 * 1024 ** 2
+
+class FigureCache:
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE, on_evict=None):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+    
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            _, evicted = self.entries.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(evicted)
+    
+    def clear(self, keep=None):
+        # `keep` leaves the cache without being evicted
+        while self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            if self.on_evict and evicted is not keep:
+                self.on_evict(evicted)
+
+class RenderSignals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+class RenderTask(QRunnable):
+    def __init__(self, request, signals, is_stale):
+        super().__init__()
+        self.request = request
+        self.signals = signals
+        self.is_stale = is_stale
+    
+    def run(self):
+        if self.is_stale(self.request):
+            return
+        ticket, viz_function, version, where, profile = self.request
+        try:
+            if profile is None:
+                fig = viz_function(where=where)
+            else:
+                fig = build_profiled(viz_function, profile, where)
+        except Exception as e:
+            self.signals.failed.emit(self.request, str(e))
+            return
+        self.signals.finished.emit(self.request, fig)
+
+def close_figure(fig):
+    import figures
+    figures.release(fig)
+
+class StartupSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class StartupTask(QRunnable):
+    # First task on the render thread, so renders queued meanwhile wait for it
+    def __init__(self, signals):
+        super().__init__()
+        self.signals = signals
+    
+    def run(self):
+        try:
+            import matplotlib.pyplot
+            import matplotlib.backends.backend_qt5agg
+            import Dataset
+            import filters
+            import visualization
+            # Only the header and the filter columns: each chart loads the
+            # columns it draws when it is first shown
+            Dataset.all_columns()
+            choices = filters.choices()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(choices)
+
+def build_profiled(viz_function, profile, where=None):
+    # Same as viz_function(where=where), with loading the plot's columns
+    # timed apart from building the figure
+    import features
+    
+    profile.add("queue", time.perf_counter() - profile.requested)
+    with profile.stage("data"):
+        df = features.get_features(registry.get(viz_function.__name__).columns, where)
+    with profile.stage("build"):
+        return viz_function(df)
+
+class PrefetchSignals(QObject):
+    finished = pyqtSignal(object, object, int)
+
+class PrefetchTask(QRunnable):
+    # request is (generation, spec, version, where, with_figure). Waits its turn
+    # behind real renders and does nothing once the user has moved on.
+    def __init__(self, request, signals, is_stale):
+        super().__init__()
+        self.request = request
+        self.signals = signals
+        self.is_stale = is_stale
+    
+    def run(self):
+        if self.is_stale(self.request):
+            return
+        import correlation
+        import features
+        
+        generation, spec, version, where, with_figure = self.request
+        fig = None
+        try:
+            df = features.get_features(spec.columns, where)
+            if spec.category == "Correlation Analysis":
+                correlation.correlation(df)
+            size = int(df.memory_usage(index=False).sum())
+            if with_figure and not self.is_stale(self.request):
+                fig = registry.load(spec)(df)
+                width, height = fig.get_size_inches() * fig.dpi
+                # Agg buffer plus the canvas's copy of it
+                size += int(width * height) * 4 * 2
+        except Exception:
+            # A real render of this chart will report the error
+            size = 0
+        self.signals.finished.emit(self.request, fig, size)
+
+class DataUpdateSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class DataUpdateTask(QRunnable):
+    # Runs on the render thread, so the dataset never changes under a render
+    def __init__(self, signals):
+        super().__init__()
+        self.signals = signals
+    
+    def run(self):
+        import hotreload
+        
+        try:
+            appended = hotreload.update_dataset()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(appended)
+
+class LiveSignals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+class LiveTask(QRunnable):
+    # request is (ticket, live chart, version, where); computes the chart's
+    # new artist data, which the GUI thread applies
+    def __init__(self, request, signals, is_stale):
+        super().__init__()
+        self.request = request
+        self.signals = signals
+        self.is_stale = is_stale
+    
+    def run(self):
+        if self.is_stale(self.request):
+            return
+        ticket, chart, version, where = self.request
+        try:
+            update = chart.compute(where)
+        except Exception as e:
+            self.signals.failed.emit(self.request, str(e))
+            return
+        self.signals.finished.emit(self.request, update)
 
 class CollapsibleSection(QWidget):
     def __init__(self, title, parent=None):
@@ -96,6 +292,81 @@ class CollapsibleSection(QWidget):
         self.content_layout.addWidget(button)
         return button
 
+class FilterPanel(CollapsibleSection):
+    # Sidebar section restricting every chart to the matching rows. Its
+    # controls are built once the data is loaded and the choices are known.
+    def __init__(self, on_apply, parent=None):
+        super(FilterPanel, self).__init__("Filters", parent)
+        self.on_apply = on_apply
+        self.checkboxes = {}
+        self.spinboxes = {}
+        self.bounds = {}
+        self.placeholder = QLabel("Available once the data is loaded")
+        self.placeholder.setStyleSheet(f"color: {self.text_color};")
+        self.content_layout.addWidget(self.placeholder)
+    
+    def populate(self, choices):
+        import filters
+        self.placeholder.hide()
+        grid = QGridLayout()
+        row = 0
+        for column in filters.CATEGORY_COLUMNS:
+            label = QLabel(column.replace("_", " "))
+            label.setStyleSheet(f"color: {self.text_color};")
+            grid.addWidget(label, row, 0)
+            self.checkboxes[column] = []
+            for i, value in enumerate(choices[column]):
+                checkbox = QCheckBox(str(value))
+                checkbox.setChecked(True)
+                checkbox.setStyleSheet(f"color: {self.text_color};")
+                grid.addWidget(checkbox, row, 1 + i)
+                self.checkboxes[column].append((value, checkbox))
+            row += 1
+        for column in filters.RANGE_COLUMNS:
+            # Widened to the spin boxes' one decimal so the defaults keep every row
+            low, high = math.floor(choices[column][0] * 10) / 10, math.ceil(choices[column][1] * 10) / 10
+            self.bounds[column] = (low, high)
+            label = QLabel(column.replace("_", " "))
+            label.setStyleSheet(f"color: {self.text_color};")
+            grid.addWidget(label, row, 0)
+            spinboxes = []
+            for i, value in enumerate((low, high)):
+                spinbox = QDoubleSpinBox()
+                spinbox.setRange(low, high)
+                spinbox.setDecimals(1)
+                spinbox.setValue(value)
+                spinbox.setStyleSheet("background-color: white; color: #2c3e50;")
+                grid.addWidget(spinbox, row, 1 + i)
+                spinboxes.append(spinbox)
+            self.spinboxes[column] = spinboxes
+            row += 1
+        self.content_layout.addLayout(grid)
+        self.add_button("Apply Filters", lambda checked=False: self.on_apply(self.where()))
+        self.add_button("Clear Filters", lambda checked=False: self.clear())
+    
+    def where(self):
+        # A range left at the data's own bound is open on that side
+        import filters
+        where = {}
+        for column, boxes in self.checkboxes.items():
+            selected = [value for value, checkbox in boxes if checkbox.isChecked()]
+            if len(selected) < len(boxes):
+                where[column] = selected
+        for column, (low_box, high_box) in self.spinboxes.items():
+            low, high = self.bounds[column]
+            where[column] = (None if low_box.value() <= low else low_box.value(),
+                             None if high_box.value() >= high else high_box.value())
+        return filters.normalize(where)
+    
+    def clear(self):
+        for boxes in self.checkboxes.values():
+            for _, checkbox in boxes:
+                checkbox.setChecked(True)
+        for column, (low_box, high_box) in self.spinboxes.items():
+            low_box.setValue(self.bounds[column][0])
+            high_box.setValue(self.bounds[column][1])
+        self.on_apply(None)
+
 class HelpDialog(QDialog):
     def __init__(self, parent=None):
         super(HelpDialog, self).__init__(parent)
@@ -179,7 +450,7 @@ class HelpDialog(QDialog):
         layout.addLayout(button_layout)
 
 class HealthvizApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, figure_cache_size=FIGURE_CACHE_SIZE, profile=False):
         super().__init__()
         
         self.primary_color = "#3498db"
@@ -188,7 +459,69 @@ class HealthvizApp(QMainWindow):
         self.text_color = "#ecf0f1"
         self.light_bg = "#f5f7fa"
         
+        self.figure_cache = FigureCache(figure_cache_size, on_evict=self.discard_viz_page)
+        
+        # One render thread: only the latest chart matters here, and a newer
+        # request makes the queued ones stale (renderer.py draws many at once)
+        self.render_pool = QThreadPool()
+        self.render_pool.setMaxThreadCount(1)
+        self.render_signals = RenderSignals()
+        self.render_signals.finished.connect(self.on_render_finished)
+        self.render_signals.failed.connect(self.on_render_failed)
+        self.render_ticket = 0
+        self.current_viz = None
+        self.render_log = instrumentation.RenderLog() if profile else None
+        if profile:
+            instrumentation.start()
+        # Page of the previous dataset version left on screen until its re-render arrives
+        self.stale_page = None
+        
+        self.current_spec = None
+        # Normalized filter every chart is rendered with (None: all rows)
+        self.where = None
+        self.sections = {}
+        self.prefetch_signals = PrefetchSignals()
+        self.prefetch_signals.finished.connect(self.on_prefetch_finished)
+        self.prefetch_generation = 0
+        self.prefetch_queue = []
+        self.prefetch_spent = 0
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(PREFETCH_IDLE_MS)
+        self.prefetch_timer.timeout.connect(self.run_next_prefetch)
+        
+        self.data_signals = DataUpdateSignals()
+        self.data_signals.finished.connect(self.on_data_updated)
+        self.data_signals.failed.connect(self.on_data_update_failed)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(RELOAD_DEBOUNCE_MS)
+        self.reload_timer.timeout.connect(self.check_for_new_data)
+        self.file_watcher = None
+        
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(LIVE_INTERVAL_MS)
+        self.live_timer.timeout.connect(self.check_for_new_data)
+        self.live_signals = LiveSignals()
+        self.live_signals.finished.connect(self.on_live_update)
+        self.live_signals.failed.connect(self.on_live_update_failed)
+        # Live chart of the page on screen, while live mode is on
+        self.live_chart = None
+        
+        # Until StartupTask finishes, a sidebar click is only remembered
+        self.data_ready = False
+        self.pending_spec = None
+        self.startup_running = False
+        self.startup_signals = StartupSignals()
+        self.startup_signals.finished.connect(self.on_startup_finished)
+        self.startup_signals.failed.connect(self.on_startup_failed)
+        
         self.init_ui()
+        self.start_loading()
+    
+    def start_loading(self):
+        self.startup_running = True
+        self.render_pool.start(StartupTask(self.startup_signals))
     
     def init_ui(self):
         self.setWindowTitle("Healthviz Visualizer")
@@ -327,54 +660,34 @@ class HealthvizApp(QMainWindow):
         empty_layout.addStretch(1)
         self.viz_stack.addWidget(self.empty_state)
         
-        self.viz_widget = QWidget()
-        self.viz_widget_layout = QVBoxLayout(self.viz_widget)
-        self.viz_stack.addWidget(self.viz_widget)
+        self.loading_state = QWidget()
+        loading_layout = QVBoxLayout(self.loading_state)
+        loading_layout.setAlignment(Qt.AlignCenter)
+        
+        loading_layout.addStretch(1)
+        loading_label = QLabel("Rendering visualization...")
+        loading_label.setFont(QFont("Segoe UI", 14))
+        loading_label.setStyleSheet("color: #6c757d;")
+        loading_label.setAlignment(Qt.AlignCenter)
+        loading_layout.addWidget(loading_label)
+        self.loading_spinner = QProgressBar()
+        self.loading_spinner.setRange(0, 0)
+        self.loading_spinner.setTextVisible(False)
+        self.loading_spinner.setFixedWidth(240)
+        loading_layout.addWidget(self.loading_spinner, alignment=Qt.AlignCenter)
+        loading_layout.addStretch(1)
+        self.viz_stack.addWidget(self.loading_state)
     
     def create_sidebar_categories(self, parent_layout):
-        categories = {
-        "Basic Distributions": [
-            ("Age Distribution", lambda: self.show_visualization(vis.plot_age_distribution)),
-            ("BMI Distribution", lambda: self.show_visualization(vis.plot_bmi_distribution)),
-            ("Sleep Hours Distribution", lambda: self.show_visualization(vis.plot_sleep_distribution)),
-            ("Daily Steps Distribution", lambda: self.show_visualization(vis.plot_steps_distribution)),
-            ("Heart Rate Distribution", lambda: self.show_visualization(vis.plot_heart_rate_distribution))
-        ],
-        "Comparative Analysis": [
-            ("BMI by Gender", lambda: self.show_visualization(vis.plot_bmi_by_gender)),
-            ("Exercise Hours by Smoker Status", lambda: self.show_visualization(vis.plot_exercise_by_smoker)),
-            ("Sleep by Age Group", lambda: self.show_visualization(vis.plot_sleep_by_age_group)),
-            ("Alcohol Consumption by Gender", lambda: self.show_visualization(vis.plot_alcohol_kde_by_gender)),
-            ("Heart Rate by Diabetic Status", lambda: self.show_visualization(vis.plot_heart_rate_by_diabetic))
-        ],
-        "Correlation Analysis": [
-            ("Health Metrics Heatmap", lambda: self.show_visualization(vis.plot_health_metrics_heatmap)),
-            ("Lifestyle vs Vitals Correlation", lambda: self.show_visualization(vis.plot_lifestyle_vital_correlation)),
-            ("Clustermap of All Variables", lambda: self.show_visualization(vis.plot_clustermap)),
-            ("Age vs Health Indicators Correlation", lambda: self.show_visualization(vis.plot_age_health_correlation)),
-            ("Exercise Impact Analysis", lambda: self.show_visualization(vis.plot_exercise_impact_correlation))
-        ],
-        "Multivariate Analysis": [
-            ("Daily Steps vs BMI", lambda: self.show_visualization(vis.plot_steps_vs_bmi)),
-            ("BMI vs Age Scatter", lambda: self.show_visualization(vis.plot_bmi_vs_age)),
-            ("Alcohol vs Heart Rate", lambda: self.show_visualization(vis.plot_alcohol_vs_heart_rate)),
-            ("Sleep vs Exercise Hours", lambda: self.show_visualization(vis.plot_sleep_vs_exercise)),
-            ("Calorie Intake vs Weight", lambda: self.show_visualization(vis.plot_calories_vs_weight))
-        ],
-        "Advanced Visualizations": [
-            ("FacetGrid: Health Metrics by Gender", lambda: self.show_visualization(vis.plot_facetgrid_metrics_by_gender)),
-            ("Health Radar Chart", lambda: self.show_visualization(vis.plot_health_radar_chart)),
-            ("Comprehensive Health Dashboard", lambda: self.show_visualization(vis.plot_health_dashboard)),
-            ("Risk Factors Sunburst Chart", lambda: self.show_visualization(vis.plot_risk_factors_sunburst)),
-            ("3D Analysis: Age-BMI-Heart Rate", lambda: self.show_visualization(vis.plot_3d_health_analysis))
-        ]
-    }
-    
-        for category, buttons in categories.items():
+        self.filter_panel = FilterPanel(self.set_filter)
+        parent_layout.addWidget(self.filter_panel)
+        
+        for category, specs in registry.by_category().items():
             section = CollapsibleSection(category)
+            self.sections[category] = section
             
-            for button_text, callback in buttons:
-                section.add_button(button_text, callback)
+            for spec in specs:
+                section.add_button(spec.title, lambda checked=False, spec=spec: self.show_plot(spec))
             
             parent_layout.addWidget(section)
     
@@ -387,11 +700,12 @@ class HealthvizApp(QMainWindow):
         footer_layout = QHBoxLayout(footer)
         footer_layout.setContentsMargins(15, 8, 15, 8)
         
-        version_label = QLabel("Healthviz")
-        version_label.setFont(QFont("Segoe UI", 8))
-        version_label.setStyleSheet(f"color: {self.text_color};")
+        # With profiling on, this shows the timings of the last render
+        self.status_label = QLabel("Healthviz")
+        self.status_label.setFont(QFont("Segoe UI", 8))
+        self.status_label.setStyleSheet(f"color: {self.text_color};")
         
-        footer_layout.addWidget(version_label)
+        footer_layout.addWidget(self.status_label)
         footer_layout.addStretch()
         
         help_button = QPushButton("Help")
@@ -428,35 +742,384 @@ class HealthvizApp(QMainWindow):
         """)
         exit_button.clicked.connect(self.close_application)
         
+        reload_button = QPushButton("Reload Data")
+        reload_button.setFont(QFont("Segoe UI", 10))
+        reload_button.setCursor(Qt.PointingHandCursor)
+        reload_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {self.primary_color};
+                color: {self.text_color};
+                border: none;
+                padding: 6px 12px;
+                border-radius: 4px;
+            }}
+            QPushButton:hover {{
+                background-color: #2980b9;
+            }}
+        """)
+        reload_button.clicked.connect(self.reload_data)
+        
+        self.live_button = QPushButton("Live")
+        self.live_button.setFont(QFont("Segoe UI", 10))
+        self.live_button.setCursor(Qt.PointingHandCursor)
+        self.live_button.setCheckable(True)
+        self.live_button.setStyleSheet(reload_button.styleSheet() + f"""
+            QPushButton:checked {{
+                background-color: {self.accent_color};
+            }}
+        """)
+        self.live_button.toggled.connect(self.set_live)
+        # Nothing to poll until the dataset has loaded
+        self.live_button.setEnabled(False)
+        
+        if self.render_log is not None:
+            export_log_button = QPushButton("Export Render Log")
+            export_log_button.setFont(QFont("Segoe UI", 10))
+            export_log_button.setCursor(Qt.PointingHandCursor)
+            export_log_button.setStyleSheet(reload_button.styleSheet())
+            export_log_button.clicked.connect(self.export_render_log)
+            footer_layout.addWidget(export_log_button)
+        
+        footer_layout.addWidget(self.live_button)
+        footer_layout.addWidget(reload_button)
         footer_layout.addWidget(help_button)
         footer_layout.addWidget(exit_button)
         
         parent_layout.addWidget(footer)
     
+    def set_current_page(self, widget):
+        self.viz_stack.setCurrentWidget(widget)
+        self.attach_live_chart()
+        if self.stale_page is not None and self.stale_page is not widget:
+            stale_page, self.stale_page = self.stale_page, None
+            self.discard_viz_page(stale_page)
+    
     def show_empty_state(self):
-        self.viz_stack.setCurrentWidget(self.empty_state)
+        self.set_current_page(self.empty_state)
+    
+    def show_loading_state(self):
+        self.set_current_page(self.loading_state)
+    
+    def on_startup_finished(self, filter_choices):
+        import Dataset
+        
+        self.data_ready = True
+        self.startup_running = False
+        self.filter_panel.populate(filter_choices)
+        self.file_watcher = QFileSystemWatcher([Dataset.source_path()], self)
+        self.file_watcher.fileChanged.connect(self.reload_timer.start)
+        self.live_button.setEnabled(True)
+        if self.pending_spec is not None:
+            spec, self.pending_spec = self.pending_spec, None
+            self.show_plot(spec)
+    
+    def on_startup_failed(self, message):
+        self.startup_running = False
+        QMessageBox.critical(self, "Error", f"Failed to load the dataset:\n{message}")
+        self.pending_spec = None
+        self.show_empty_state()
+    
+    def show_plot(self, spec):
+        self.cancel_prefetch()
+        if not self.data_ready:
+            # After a failed load, the next click tries again
+            self.pending_spec = spec
+            self.show_loading_state()
+            if not self.startup_running:
+                self.start_loading()
+            return
+        self.current_spec = spec
+        self.show_visualization(registry.load(spec))
     
     def show_visualization(self, viz_function):
+        import Dataset
+        
+        self.current_viz = viz_function
+        page = self.figure_cache.get((viz_function, Dataset.version, self.where))
+        if page is not None:
+            self.render_ticket += 1
+            self.set_current_page(page)
+            self.schedule_prefetch()
+            return
+        
+        self.show_loading_state()
+        self.start_render(viz_function)
+    
+    def start_render(self, viz_function):
+        import Dataset
+        
+        # A new request supersedes any render still queued or running
+        self.render_ticket += 1
+        profile = None
+        if self.render_log is not None:
+            profile = instrumentation.RenderProfile(registry.get(viz_function.__name__).id, Dataset.version)
+        request = (self.render_ticket, viz_function, Dataset.version, self.where, profile)
+        self.render_pool.start(RenderTask(request, self.render_signals, self.is_stale_render))
+    
+    def is_stale_render(self, request):
+        return request[0] != self.render_ticket
+    
+    def on_render_finished(self, request, fig):
+        import Dataset
+        
+        ticket, viz_function, version, where, profile = request
+        if version != Dataset.version:
+            self.render_pool.start(lambda: close_figure(fig))
+            return
+        
+        # A render that finished after the user moved on is still cached,
+        # it just isn't brought to the front.
+        if profile is None:
+            page = self.create_viz_page(fig)
+        else:
+            with profile.stage("canvas"):
+                page = self.create_viz_page(fig)
+        self.viz_stack.addWidget(page)
+        self.figure_cache.put((viz_function, version, where), page)
+        if ticket != self.render_ticket:
+            if profile is not None:
+                self.record_render(profile)
+            return
+        if profile is not None:
+            # Ends at the canvas's first draw, which happens in Qt's paint
+            profile.begin("paint")
+            connection = []
+            def on_first_draw(event):
+                page.canvas.mpl_disconnect(connection[0])
+                profile.end()
+                self.record_render(profile)
+            connection.append(page.canvas.mpl_connect("draw_event", on_first_draw))
+        self.set_current_page(page)
+        self.schedule_prefetch()
+    
+    def schedule_prefetch(self):
+        import Dataset
+        
+        # The charts after the current one in its section, then the ones
+        # before it; only while that section is open
+        self.cancel_prefetch()
+        spec = self.current_spec
+        if spec is None or not self.sections[spec.category].is_expanded:
+            return
+        specs = registry.by_category()[spec.category]
+        position = specs.index(spec)
+        figures = PREFETCH_FIGURES
+        for other in specs[position + 1:] + specs[:position]:
+            cached = (registry.load(other), Dataset.version, self.where) in self.figure_cache.entries
+            with_figure = not cached and figures > 0 and other.cost != "heavy"
+            if with_figure:
+                figures -= 1
+            if not cached:
+                self.prefetch_queue.append((other, with_figure))
+        self.prefetch_timer.start()
+    
+    def cancel_prefetch(self):
+        self.prefetch_generation += 1
+        self.prefetch_queue = []
+        self.prefetch_spent = 0
+        self.prefetch_timer.stop()
+    
+    def is_stale_prefetch(self, request):
+        return request[0] != self.prefetch_generation
+    
+    def run_next_prefetch(self):
+        import Dataset
+        
+        if not self.prefetch_queue or self.prefetch_spent >= PREFETCH_MEMORY_BUDGET:
+            self.prefetch_queue = []
+            return
+        spec, with_figure = self.prefetch_queue.pop(0)
+        request = (self.prefetch_generation, spec, Dataset.version, self.where, with_figure)
+        self.render_pool.start(PrefetchTask(request, self.prefetch_signals, self.is_stale_prefetch))
+    
+    def on_prefetch_finished(self, request, fig, size):
+        import Dataset
+        
+        generation, spec, version, where, with_figure = request
+        if fig is not None:
+            key = (registry.load(spec), version, where)
+            cache = self.figure_cache
+            # A prefetched page never pushes out one the user has seen, and
+            # goes first in line for eviction itself
+            if (self.is_stale_prefetch(request) or version != Dataset.version or key in cache.entries
+                    or len(cache.entries) >= cache.max_entries):
+                self.render_pool.start(lambda: close_figure(fig))
+            else:
+                page = self.create_viz_page(fig)
+                self.viz_stack.addWidget(page)
+                cache.put(key, page)
+                cache.entries.move_to_end(key, last=False)
+        if self.is_stale_prefetch(request):
+            return
+        self.prefetch_spent += size
+        self.prefetch_timer.start()
+    
+    def record_render(self, profile):
+        self.render_log.add(profile)
+        self.status_label.setText(profile.summary())
+    
+    def export_render_log(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Render Log", "render_log.csv",
+                                              "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
         try:
-            while self.viz_widget_layout.count():
-                item = self.viz_widget_layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-            
-            fig = viz_function()
-            
-            canvas = FigureCanvas(fig)
-            self.viz_widget_layout.addWidget(canvas)
-            
-            toolbar = NavigationToolbar(canvas, self.viz_widget)
-            self.viz_widget_layout.addWidget(toolbar)
-            
-            self.viz_stack.setCurrentWidget(self.viz_widget)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate visualization:\n{str(e)}")
+            count = self.render_log.export(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to export render log:\n{str(e)}")
+            return
+        self.status_label.setText(f"Exported {count} renders to {path}")
+    
+    def on_render_failed(self, request, message):
+        if self.is_stale_render(request):
+            return
+        QMessageBox.critical(self, "Error", f"Failed to generate visualization:\n{message}")
+        self.show_empty_state()
+    
+    def create_viz_page(self, fig):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        
+        canvas = FigureCanvas(fig)
+        page_layout.addWidget(canvas)
+        
+        toolbar = NavigationToolbar(canvas, page)
+        page_layout.addWidget(toolbar)
+        
+        page.figure = fig
+        page.canvas = canvas
+        return page
+    
+    def discard_viz_page(self, page):
+        if self.viz_stack.currentWidget() is page:
             self.show_empty_state()
+        self.viz_stack.removeWidget(page)
+        page.deleteLater()
+        fig = page.figure
+        self.render_pool.start(lambda: close_figure(fig))
+    
+    def set_filter(self, where):
+        # Pages are cached per filter, so going back to one is instant
+        import filters
+        where = filters.normalize(where)
+        if where == self.where:
+            return
+        self.where = where
+        self.cancel_prefetch()
+        self.status_label.setText(f"Filter: {filters.describe(where)}")
+        if self.current_viz is not None and self.viz_stack.currentWidget() is not self.empty_state:
+            self.show_visualization(self.current_viz)
+    
+    def check_for_new_data(self):
+        if not self.data_ready or self.file_watcher is None:
+            return
+        import Dataset
+        
+        path = Dataset.source_path()
+        # Editors and atomic writers replace the file, which drops it from the watch
+        if path not in self.file_watcher.files() and os.path.exists(path):
+            self.file_watcher.addPath(path)
+        self.render_pool.start(DataUpdateTask(self.data_signals))
+    
+    def on_data_updated(self, appended):
+        if appended == 0:
+            return
+        self.cancel_prefetch()
+        # Only the chart on screen is rendered again (or updated in place in
+        # live mode); it stays up until the new version replaces it. Every
+        # other cached page is dropped.
+        current = self.viz_stack.currentWidget()
+        if current in (self.empty_state, self.loading_state):
+            self.figure_cache.clear()
+        else:
+            self.figure_cache.clear(keep=current)
+            self.stale_page = current
+        if self.live_chart is not None and current is self.live_chart.page:
+            self.start_live_update()
+        elif self.current_viz is not None and current is not self.empty_state:
+            self.start_render(self.current_viz)
+    
+    def set_live(self, enabled):
+        if enabled:
+            self.live_timer.start()
+            self.attach_live_chart()
+        else:
+            self.live_timer.stop()
+            self.detach_live_chart()
+        self.status_label.setText("Live updates on" if enabled else "Live updates off")
+    
+    def attach_live_chart(self):
+        # The live chart follows the page on screen
+        page = self.viz_stack.currentWidget()
+        if self.live_chart is not None and self.live_chart.page is page:
+            return
+        self.detach_live_chart()
+        if not self.live_button.isChecked() or self.current_viz is None or not hasattr(page, "canvas"):
+            return
+        import live
+        
+        self.live_chart = live.create(registry.get(self.current_viz.__name__).id, page.canvas)
+        if self.live_chart is not None:
+            self.live_chart.page = page
+            self.live_chart.start()
+    
+    def detach_live_chart(self):
+        if self.live_chart is not None:
+            self.live_chart.stop()
+            self.live_chart = None
+    
+    def start_live_update(self):
+        import Dataset
+        
+        # Supersedes renders the same way start_render does
+        self.render_ticket += 1
+        request = (self.render_ticket, self.live_chart, Dataset.version, self.where)
+        self.render_pool.start(LiveTask(request, self.live_signals, self.is_stale_render))
+    
+    def on_live_update(self, request, update):
+        import Dataset
+        
+        ticket, chart, version, where = request
+        if self.is_stale_render(request) or version != Dataset.version or chart is not self.live_chart:
+            return
+        if update is None:
+            # New data outside what the chart was drawn for
+            self.start_render(self.current_viz)
+            return
+        chart.refresh(update)
+        # The page now shows this version and goes back into the cache
+        self.stale_page = None
+        self.figure_cache.put((self.current_viz, version, where), chart.page)
+    
+    def on_live_update_failed(self, request, message):
+        if self.is_stale_render(request):
+            return
+        self.status_label.setText(f"Live update failed, rendering again: {message}")
+        self.start_render(self.current_viz)
+    
+    def on_data_update_failed(self, message):
+        # The charts keep showing the rows already loaded
+        self.status_label.setText(f"Could not read new data: {message}")
+    
+    def reload_data(self):
+        if not self.data_ready:
+            return
+        import Dataset
+        import features
+        
+        self.render_ticket += 1
+        self.cancel_prefetch()
+        try:
+            Dataset.reload()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to reload data:\n{str(e)}")
+            return
+        features.invalidate()
+        self.figure_cache.clear()
+        self.show_empty_state()
     
     def toggle_sidebar(self):
         if self.sidebar.isVisible():
@@ -474,6 +1137,11 @@ class HealthvizApp(QMainWindow):
             self.close()
     
     def closeEvent(self, event):
+        self.live_timer.stop()
+        self.render_ticket += 1
+        self.cancel_prefetch()
+        self.render_pool.clear()
+        self.render_pool.waitForDone()
         event.accept()
 
 def main():
@@ -489,6 +1157,6 @@ def main():
     palette.setColor(QPalette.Link, QColor("#3498db"))
     app.setPalette(palette)
     
-    window = HealthvizApp()
+    window = HealthvizApp(profile=instrumentation.requested(sys.argv))
     sys.exit(app.exec_())
 
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+# Headless, like export.py: Agg before anything imports pyplot
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import Dataset
+import features
+import figures
+import registry
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000, 10_000_000]
+STAGES = ("prep", "build", "raster")
+CSV_FIELDS = ["plot", "cost", "rows", "status", "prep_seconds", "build_seconds", "raster_seconds",
+              "total_seconds", "error"]
+
+
+def synthetic_dataset(rows, seed=0):
+    # Same columns, dtypes and value ranges as Data/health_lifestyle.csv, with
+    # Blood_Pressure as "sys/dia" strings (stored as a categorical, as the
+    # schema loads it)
+    rng = np.random.default_rng(seed)
+    systolic = rng.integers(90, 140, rows)
+    diastolic = rng.integers(60, 90, rows)
+    readings = [f"{s}/{d}" for s in range(90, 140) for d in range(60, 90)]
+    frame = pd.DataFrame({
+        "ID": np.arange(1, rows + 1),
+        "Age": rng.integers(18, 80, rows),
+        "Gender": pd.Categorical.from_codes((rng.random(rows) < 0.477).astype(np.int8), ["Male", "Female"]),
+        "Height_cm": rng.integers(150, 200, rows),
+        "Weight_kg": rng.integers(50, 120, rows),
+        "BMI": rng.uniform(18.5, 35, rows).round(2),
+        "Daily_Steps": rng.integers(1000, 20000, rows),
+        "Calories_Intake": rng.integers(1200, 3500, rows),
+        "Hours_of_Sleep": rng.uniform(4, 10, rows).round(1),
+        "Heart_Rate": rng.integers(50, 120, rows),
+        "Blood_Pressure": pd.Categorical.from_codes((systolic - 90) * 30 + diastolic - 60, readings),
+        "Exercise_Hours_per_Week": rng.uniform(0, 10, rows).round(1),
+        "Smoker": pd.Categorical.from_codes((rng.random(rows) < 0.191).astype(np.int8), ["No", "Yes"]),
+        "Alcohol_Consumption_per_Week": rng.integers(0, 10, rows),
+        "Diabetic": pd.Categorical.from_codes((rng.random(rows) < 0.155).astype(np.int8), ["No", "Yes"]),
+        "Heart_Disease": pd.Categorical.from_codes((rng.random(rows) < 0.093).astype(np.int8), ["No", "Yes"]),
+    })
+    return frame.astype(Dataset.SCHEMA)
+
+
+def plot_frame(data, columns):
+    # What get_features(columns) hands a plot, built from `data`
+    columns = list(data.columns) if columns is registry.ALL_COLUMNS else list(columns)
+    derived = {name: features.derive(name, data) if name in features.DEPENDENCIES else data[name]
+               for name in columns}
+    return pd.DataFrame(derived, columns=columns, copy=False)
+
+
+def time_plot(spec, data):
+    entry = {"plot": spec.id, "cost": spec.cost, "rows": len(data), "status": "ok"}
+    fig = None
+    try:
+        started = time.perf_counter()
+        frame = plot_frame(data, spec.columns)
+        entry["prep_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fig = registry.load(spec)(frame)
+        entry["build_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fig.canvas.draw()
+        entry["raster_seconds"] = time.perf_counter() - started
+        entry["total_seconds"] = sum(entry[f"{stage}_seconds"] for stage in STAGES)
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if fig is not None:
+            figures.release(fig)
+        plt.close("all")
+    return entry
+
+
+def environment():
+    import seaborn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "seaborn": seaborn.__version__,
+    }
+
+
+def run_benchmark(plot_ids, sizes, max_seconds=None, seed=0):
+    # A plot that takes longer than max_seconds at one size is skipped at
+    # every larger size
+    results = []
+    too_slow = set()
+    # Keep seaborn's import and matplotlib's font cache out of the first timing
+    time_plot(registry.get(plot_ids[0]), synthetic_dataset(100, seed))
+    for rows in sizes:
+        started = time.perf_counter()
+        data = synthetic_dataset(rows, seed)
+        print(f"{rows:,} rows: generated in {time.perf_counter() - started:.2f}s")
+        for plot_id in plot_ids:
+            spec = registry.get(plot_id)
+            if plot_id in too_slow:
+                entry = {"plot": plot_id, "cost": spec.cost, "rows": rows, "status": "skipped"}
+            else:
+                entry = time_plot(spec, data)
+                if max_seconds is not None and entry.get("total_seconds", 0) > max_seconds:
+                    too_slow.add(plot_id)
+            results.append(entry)
+            print(_format_entry(entry))
+        del data
+    return results
+
+
+def _format_entry(entry):
+    if entry["status"] != "ok":
+        return f"  {entry['status']:7} {entry['plot']:32} {entry.get('error', '')}"
+    stages = " ".join(f"{stage} {entry[f'{stage}_seconds']:7.3f}" for stage in STAGES)
+    return f"  {'ok':7} {entry['plot']:32} {stages}  total {entry['total_seconds']:7.3f}"
+
+
+def write_results(results, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    with open(os.path.join(out_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def compare(baseline_path, results, threshold=1.25):
+    # Stages that got slower than `threshold` x the baseline run
+    with open(baseline_path) as f:
+        baseline = {(entry["plot"], entry["rows"]): entry for entry in json.load(f)["results"]}
+    regressions = []
+    for entry in results:
+        old = baseline.get((entry["plot"], entry["rows"]))
+        if old is None or entry["status"] != "ok" or old["status"] != "ok":
+            continue
+        for stage in STAGES + ("total",):
+            before, after = old[f"{stage}_seconds"], entry[f"{stage}_seconds"]
+            # Ignore noise on stages that take a few milliseconds
+            if after > before * threshold and after - before > 0.01:
+                regressions.append((entry["plot"], entry["rows"], stage, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time data prep, figure build and Agg raster for every plot "
+                                                 "on synthetic datasets.")
+    parser.add_argument("plots", nargs="*", help="plot ids or plot_* function names (default: all)")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("-o", "--out", default="benchmark", help="directory for results.json/results.csv")
+    parser.add_argument("--max-seconds", type=float, default=60,
+                        help="skip a plot at larger sizes once it takes longer than this (default: 60)")
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="report stages slower than this earlier run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    # seaborn's deprecation notices would drown out the timings
+    warnings.simplefilter("ignore", FutureWarning)
+
+    try:
+        plot_ids = [registry.get(name).id for name in args.plots] or [spec.id for spec in registry.PLOTS]
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+
+    results = run_benchmark(plot_ids, sorted(args.sizes), args.max_seconds, args.seed)
+    write_results(results, args.out)
+    print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        regressions = compare(args.compare, results)
+        for plot_id, rows, stage, before, after in regressions:
+            print(f"slower: {plot_id} at {rows:,} rows, {stage} {before:.3f}s -> {after:.3f}s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
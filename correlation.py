@@ -0,0 +1,156 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import features
+
+CHUNK_ROWS = 1_000_000
+
+# Correlations over the current dataset view, built once and sliced by every
+# heatmap. The statistics cover only the columns plots have asked for; a plot
+# wanting others has them built in one pass over the union.
+_cache = {"key": None, "stats": None, "matrix": None}
+# Clustermap linkages for that matrix, per column set
+_linkages = {"key": None, "by_columns": {}}
+_lock = threading.RLock()
+
+
+class CorrelationStats:
+    # Pairwise-complete sufficient statistics, like DataFrame.corr(): for
+    # every pair (i, j) the count, sums and sums of squares are taken over
+    # the rows where both columns are present. Values are shifted by a fixed
+    # per-column offset to keep the raw moments well conditioned. Two stats
+    # objects with the same columns and shift can be merged.
+
+    def __init__(self, columns, shift=None):
+        size = len(columns)
+        self.columns = list(columns)
+        self.shift = None if shift is None else np.asarray(shift, dtype=np.float64)
+        self.count = np.zeros((size, size))
+        self.sums = np.zeros((size, size))
+        self.squares = np.zeros((size, size))
+        self.products = np.zeros((size, size))
+
+    def update(self, frame):
+        for start in range(0, len(frame), CHUNK_ROWS):
+            values = frame.iloc[start:start + CHUNK_ROWS][self.columns].to_numpy(dtype=np.float64)
+            if self.shift is None:
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+            values = values - self.shift
+            present = ~np.isnan(values)
+            if present.all():
+                # Every pair sees every row: only the cross products need a matmul
+                self.count += len(values)
+                self.sums += values.sum(axis=0)[:, None]
+                self.squares += (values ** 2).sum(axis=0)[:, None]
+                self.products += values.T @ values
+                continue
+            values = np.where(present, values, 0.0)
+            weights = present.astype(np.float64)
+            self.count += weights.T @ weights
+            self.sums += values.T @ weights
+            self.squares += (values ** 2).T @ weights
+            self.products += values.T @ values
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge correlation statistics over different columns")
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        elif not np.array_equal(other.shift, self.shift):
+            raise ValueError("Cannot merge correlation statistics with different shifts")
+        self.count += other.count
+        self.sums += other.sums
+        self.squares += other.squares
+        self.products += other.products
+        return self
+
+    def correlation(self):
+        n = self.count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = n * self.products - self.sums * self.sums.T
+            variance = n * self.squares - self.sums ** 2
+            corr = covariance / np.sqrt(variance * variance.T)
+        corr[n < 2] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(variance) > 0, 1.0, np.nan))
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+
+def numeric_columns(frame):
+    return [name for name in frame.columns if pd.api.types.is_numeric_dtype(frame[name].dtype)]
+
+
+def _dataset_matrix(key, columns):
+    with _lock:
+        stats = _cache["stats"] if _cache["key"] == key else None
+        if stats is None or not set(columns) <= set(stats.columns):
+            known = [] if stats is None else stats.columns
+            wanted = known + [name for name in columns if name not in known]
+            frame = features.get_features(wanted, key[1])
+            stats = CorrelationStats(wanted).update(frame)
+            # Rows appended since the plot took its frame are in this one:
+            # file the statistics under the data they were built from, so
+            # append() does not add those rows a second time
+            _cache.update(key=features.view_key(frame), stats=stats, matrix=stats.correlation())
+        return _cache["matrix"]
+
+
+def correlation(df, columns=None):
+    # Correlation matrix of `columns` (default: every numeric column of df).
+    # Frames from features.get_features() are served from the cached matrix
+    # of their dataset version and filter; any other frame gets a single
+    # pass of its own.
+    if columns is None:
+        columns = numeric_columns(df)
+    key = features.view_key(df)
+    if key is None:
+        return CorrelationStats(columns).update(df).correlation()
+    return _dataset_matrix(key, list(columns)).loc[columns, columns]
+
+
+def correlation_linkage(df, columns=None):
+    # Average linkage over the rows of the correlation matrix, as
+    # sns.clustermap computes it. For get_features() frames it is cached
+    # until the dataset changes.
+    from scipy.cluster import hierarchy
+
+    corr = correlation(df, columns)
+    key = features.view_key(df)
+    columns = tuple(corr.columns)
+    if key is not None:
+        with _lock:
+            if _linkages["key"] == key and columns in _linkages["by_columns"]:
+                return corr, _linkages["by_columns"][columns]
+    link = hierarchy.linkage(corr.fillna(0).to_numpy(), method="average", metric="euclidean")
+    if key is not None:
+        with _lock:
+            if _linkages["key"] != key:
+                _linkages.update(key=key, by_columns={})
+            _linkages["by_columns"][columns] = link
+    return corr, link
+
+
+def append(rows, key, previous_key):
+    # Fold newly appended dataset rows into the cached statistics instead of
+    # rescanning; `key` is the view key the enlarged dataset is served under.
+    with _lock:
+        stats = _cache["stats"]
+        if stats is None or _cache["key"] != previous_key:
+            invalidate()
+            return
+        missing = [name for name in stats.columns if name not in rows.columns]
+        if missing:
+            invalidate()
+            return
+        stats.update(rows)
+        _cache.update(key=key, matrix=stats.correlation())
+
+
+def invalidate():
+    with _lock:
+        _cache.update(key=None, stats=None, matrix=None)
+        _linkages.update(key=None, by_columns={})
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Headless: select Agg before anything imports pyplot, and never touch Qt.
+import matplotlib
+matplotlib.use("Agg")
+
+import registry
+
+FORMATS = ("png", "svg", "pdf")
+COST_ORDER = {"heavy": 0, "medium": 1, "light": 2}
+
+
+def resolve_plot_ids(names):
+    if not names:
+        return [spec.id for spec in registry.PLOTS]
+    try:
+        return [registry.get(name).id for name in names]
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+
+
+def _init_worker():
+    matplotlib.use("Agg")
+
+
+def render_plot(plot_id, out_dir, formats, dpi):
+    import matplotlib.pyplot as plt
+    import figures
+
+    spec = registry.get(plot_id)
+    entry = {"plot": plot_id, "cost": spec.cost, "files": [], "status": "ok"}
+    started = time.perf_counter()
+    try:
+        fig = registry.load(spec)()
+        entry["build_seconds"] = round(time.perf_counter() - started, 4)
+        entry["save_seconds"] = {}
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{plot_id}.{fmt}")
+            save_started = time.perf_counter()
+            fig.savefig(path, format=fmt, dpi=dpi, bbox_inches="tight")
+            entry["save_seconds"][fmt] = round(time.perf_counter() - save_started, 4)
+            entry["files"].append(os.path.basename(path))
+        figures.release(fig)
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")
+    entry["total_seconds"] = round(time.perf_counter() - started, 4)
+    entry["pid"] = os.getpid()
+    return entry
+
+
+def export_plots(plot_ids, out_dir, formats=("png",), jobs=None, dpi=100):
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    entries = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        # Start the heavy charts first so they don't end up as a long tail
+        queue = sorted(plot_ids, key=lambda plot_id: COST_ORDER[registry.get(plot_id).cost])
+        futures = [pool.submit(render_plot, plot_id, out_dir, formats, dpi) for plot_id in queue]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            print(f"{entry['status']:5} {entry['plot']} ({entry['total_seconds']:.2f}s)")
+
+    entries.sort(key=lambda entry: plot_ids.index(entry["plot"]))
+    manifest = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "formats": list(formats),
+        "dpi": dpi,
+        "jobs": jobs or os.cpu_count(),
+        "wall_seconds": round(time.perf_counter() - started, 4),
+        "charts": entries,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render Healthviz charts to image files without a display.")
+    parser.add_argument("plots", nargs="*", help="plot ids or plot_* function names (default: all)")
+    parser.add_argument("-o", "--out", default="export", help="output directory (default: export)")
+    parser.add_argument("-f", "--format", nargs="+", choices=FORMATS, default=["png"], dest="formats")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--list", action="store_true", help="list available plots and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for spec in registry.PLOTS:
+            print(f"{spec.id:32} {spec.cost:7} {spec.title}")
+        return 0
+
+    plot_ids = resolve_plot_ids(args.plots)
+    manifest = export_plots(plot_ids, args.out, args.formats, args.jobs, args.dpi)
+    failed = [entry for entry in manifest["charts"] if entry["status"] != "ok"]
+    print(f"Rendered {len(plot_ids) - len(failed)}/{len(plot_ids)} charts in {manifest['wall_seconds']:.2f}s -> {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
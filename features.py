@@ -0,0 +1,152 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import Dataset
+import filters
+
+AGE_BINS = [0, 30, 50, 70, 100]
+AGE_LABELS = ['<30', '30-50', '50-70', '70+']
+BMI_BINS = [0, 18.5, 25, 30, 100]
+BMI_LABELS = ['Underweight', 'Normal', 'Overweight', 'Obese']
+
+# Derived column -> the dataset columns it is computed from
+DEPENDENCIES = {
+    'Systolic': ('Blood_Pressure',),
+    'Diastolic': ('Blood_Pressure',),
+    'Age_Group': ('Age',),
+    'BMI_Category': ('BMI',),
+    'Health_Risk': ('BMI', 'Heart_Rate'),
+}
+DERIVED_COLUMNS = list(DEPENDENCIES)
+
+_cache = {"version": None, "columns": {}}
+# Plots may be drawn from several threads (renderer.py)
+_lock = threading.RLock()
+# id(frame) -> (weakref to a frame handed out by get_features, its data key:
+# (dataset version, normalized filter))
+_views = {}
+
+
+def split_blood_pressure(blood_pressure):
+    # "137/72" -> (137, 72). For a categorical column only the distinct
+    # readings are split and the result is gathered back through the codes.
+    if isinstance(blood_pressure.dtype, pd.CategoricalDtype):
+        parts = pd.Series(blood_pressure.cat.categories).str.split('/', n=1, expand=True).astype('int16')
+        codes = blood_pressure.cat.codes.to_numpy()
+        systolic = parts[0].to_numpy()[codes]
+        diastolic = parts[1].to_numpy()[codes]
+    else:
+        parts = blood_pressure.str.split('/', n=1, expand=True).astype('int16')
+        systolic = parts[0].to_numpy()
+        diastolic = parts[1].to_numpy()
+    return (pd.Series(systolic, index=blood_pressure.index, name='Systolic'),
+            pd.Series(diastolic, index=blood_pressure.index, name='Diastolic'))
+
+
+def derive(name, frame):
+    if name == 'Systolic':
+        return split_blood_pressure(frame['Blood_Pressure'])[0]
+    if name == 'Diastolic':
+        return split_blood_pressure(frame['Blood_Pressure'])[1]
+    if name == 'Age_Group':
+        return pd.cut(frame['Age'], bins=AGE_BINS, labels=AGE_LABELS)
+    if name == 'BMI_Category':
+        return pd.cut(frame['BMI'], bins=BMI_BINS, labels=BMI_LABELS)
+    if name == 'Health_Risk':
+        high_risk = ((frame['BMI'] > 30) | (frame['Heart_Rate'] > 90)).to_numpy()
+        return pd.Series(pd.Categorical.from_codes(high_risk.astype(np.int8), ['Low', 'High']),
+                         index=frame.index, name=name)
+    raise KeyError(name)
+
+
+def build_features(frame):
+    derived = {name: derive(name, frame) for name in DERIVED_COLUMNS}
+    return pd.concat([frame, pd.DataFrame(derived, index=frame.index)], axis=1)
+
+
+def base_columns(columns):
+    base = []
+    for name in columns:
+        for dependency in DEPENDENCIES.get(name, (name,)):
+            if dependency not in base:
+                base.append(dependency)
+    return base
+
+
+def get_features(columns=None, where=None):
+    # `where` (see filters.py) keeps only the matching rows
+    where = filters.normalize(where)
+    with _lock:
+        return _get_features(columns, where)
+
+
+def _get_features(columns, where):
+    if _cache["version"] != Dataset.version:
+        _cache["version"] = Dataset.version
+        _cache["columns"] = {}
+
+    if columns is None:
+        # registry.ALL_COLUMNS: the dataset's own columns, none derived
+        columns = Dataset.all_columns()
+    frame = Dataset.get_df(base_columns(columns))
+
+    derived = _cache["columns"]
+    data = {}
+    for name in columns:
+        if name in DEPENDENCIES:
+            if name not in derived:
+                derived[name] = derive(name, frame)
+            data[name] = derived[name]
+        else:
+            data[name] = frame[name]
+    # Plots get a fresh frame over shared columns: adding or replacing
+    # columns on it never reaches the cache, so plots cannot affect one another.
+    view = pd.DataFrame(data, columns=list(columns), copy=False)
+    if where is not None:
+        # Renumbered from 0 like the full frame; plots such as the radar
+        # charts pick rows by label
+        view = view.take(filters.rows(where)).reset_index(drop=True)
+    _remember_view(view, (Dataset.version, where))
+    return view
+
+
+def _remember_view(view, key):
+    view_id = id(view)
+    _views[view_id] = (weakref.ref(view, lambda _: _views.pop(view_id, None)), key)
+
+
+def view_key(frame):
+    # Key of the dataset state a get_features() frame was taken from, so
+    # caches over the whole dataset can serve it. None for any other frame.
+    entry = _views.get(id(frame))
+    if entry is None or entry[0]() is not frame:
+        return None
+    return entry[1]
+
+
+def append_tail():
+    # Dataset.append_tail(), with the cached derived columns extended by the
+    # new rows rather than derived again over the whole dataset. Holds the
+    # lock get_features() does, so a plot on another thread (server.py runs
+    # updates beside the renders) never sees the rows without them. Returns
+    # Dataset.append_tail()'s result and the version before it.
+    with _lock:
+        previous_version = Dataset.version
+        rows = Dataset.append_tail()
+        if rows is None or _cache["version"] != previous_version:
+            invalidate()
+        elif not rows.empty:
+            derived = _cache["columns"]
+            for name in derived:
+                derived[name] = pd.concat([derived[name], derive(name, rows)])
+            _cache["version"] = Dataset.version
+        return rows, previous_version
+
+
+def invalidate():
+    with _lock:
+        _cache["version"] = None
+        _cache["columns"] = {}
@@ -0,0 +1,92 @@
+import sys
+import threading
+import weakref
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Figures for the plots, made without pyplot: pyplot's figure manager keeps
+# a reference to every figure until plt.close(), which nothing in a long GUI
+# session reliably calls. Plots draw on a figure from acquire() (or one they
+# are handed), and whoever is done with it calls release(), which drops
+# every artist and keeps up to FIGURE_POOL_SIZE empty figures for reuse.
+FIGURE_POOL_SIZE = 8
+SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+class FigurePool:
+    def __init__(self, max_size=FIGURE_POOL_SIZE):
+        self.max_size = max_size
+        self.idle = []
+        # Figures this pool made; only those go back into it
+        self.owned = weakref.WeakSet()
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, figsize):
+        with self._lock:
+            fig = self.idle.pop() if self.idle else None
+            if fig is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if fig is None:
+            fig = Figure(figsize=figsize)
+            self.owned.add(fig)
+        else:
+            fig.set_size_inches(figsize)
+        return prepare(fig)
+
+    def release(self, fig):
+        close(fig)
+        with self._lock:
+            self.released += 1
+            if fig in self.owned and len(self.idle) < self.max_size and not any(f is fig for f in self.idle):
+                self.idle.append(fig)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self.idle), "created": self.created, "reused": self.reused,
+                    "released": self.released}
+
+
+def prepare(fig, figsize=None):
+    # Blank `fig` for a new plot, on an Agg canvas (the GUI swaps in its Qt
+    # canvas afterwards)
+    fig.clear()
+    fig.set_dpi(matplotlib.rcParams["figure.dpi"])
+    fig.subplots_adjust(**{name: matplotlib.rcParams[f"figure.subplot.{name}"] for name in SUBPLOT_PARAMS})
+    if figsize is not None:
+        fig.set_size_inches(figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _pyplot():
+    # pyplot only matters if something (seaborn) already imported it
+    return sys.modules.get("matplotlib.pyplot")
+
+
+def close(fig):
+    # Really frees a figure: out of pyplot's manager if seaborn put it there,
+    # and without its artists even if something still holds the figure
+    if _pyplot() is not None:
+        _pyplot().close(fig)
+    # Off any GUI canvas first: clearing updates the canvas's toolbar, which
+    # may be gone already and must not be touched from a worker thread
+    FigureCanvasAgg(fig)
+    fig.clear()
+
+
+pool = FigurePool()
+
+
+def acquire(figsize):
+    return pool.acquire(figsize)
+
+
+def release(fig):
+    pool.release(fig)
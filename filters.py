@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import Dataset
+
+# Row filters ("smokers aged 50 to 70 with BMI over 30") answered from
+# indexes built once per dataset version instead of boolean scans of the
+# frame. Categorical columns get a bitmap (one bit per row) for every value.
+# Range columns keep their rows in sorted order, plus RANGE_BINS bitmaps of
+# "the first i/RANGE_BINS of that order": a range is the difference of two of
+# them, with only the rows in the partial bins at either end set one by one.
+# Combining filters is bitwise AND/OR over n/8 bytes.
+#
+# A filter is a mapping {column: values} for CATEGORY_COLUMNS and
+# {column: (low, high)} for RANGE_COLUMNS, bounds inclusive and None for
+# open. normalize() turns it into the hashable form caches are keyed by.
+CATEGORY_COLUMNS = ("Gender", "Smoker", "Diabetic", "Heart_Disease")
+RANGE_COLUMNS = ("Age", "BMI", "Heart_Rate")
+# Costs RANGE_BINS / 8 bytes per row and range column
+RANGE_BINS = 16
+SELECTION_CACHE_SIZE = 16
+
+_lock = threading.RLock()
+_index = {"version": None, "index": None}
+# (dataset version, normalized filter) -> selected row positions
+_selections = OrderedDict()
+
+
+def normalize(where):
+    # Dict or already normalized tuple -> sorted tuple of (column, condition),
+    # or None when nothing is filtered
+    if not where:
+        return None
+    items = []
+    for column, condition in dict(where).items():
+        if column in CATEGORY_COLUMNS:
+            items.append((column, tuple(sorted(condition))))
+        elif column in RANGE_COLUMNS:
+            low, high = condition
+            if low is None and high is None:
+                continue
+            items.append((column, (low, high)))
+        else:
+            raise KeyError(f"Cannot filter on {column}")
+    return tuple(sorted(items)) or None
+
+
+def describe(where):
+    parts = []
+    for column, condition in normalize(where) or ():
+        if column in CATEGORY_COLUMNS:
+            parts.append(f"{column}: {', '.join(condition) or 'none'}")
+        elif condition[0] is None:
+            parts.append(f"{column} ≤ {condition[1]:g}")
+        elif condition[1] is None:
+            parts.append(f"{column} ≥ {condition[0]:g}")
+        else:
+            parts.append(f"{column} {condition[0]:g}–{condition[1]:g}")
+    return " · ".join(parts) or "All rows"
+
+
+class FilterIndex:
+    def __init__(self, frame):
+        self.rows = len(frame)
+        self.bitmaps = {}
+        self.sorted = {}
+        for column in CATEGORY_COLUMNS:
+            values = frame[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[column] = {name: np.packbits(codes == code)
+                                    for code, name in enumerate(values.cat.categories)}
+        for column in RANGE_COLUMNS:
+            values = frame[column].to_numpy(dtype=np.float64)
+            # NaN sorts last and is never inside a range
+            order = np.argsort(values, kind="stable")
+            finite = int(np.isfinite(values).sum())
+            cuts = np.unique(np.linspace(0, finite, RANGE_BINS + 1).astype(np.int64))
+            prefixes = []
+            mask = np.zeros(self.rows, dtype=bool)
+            for previous, cut in zip(np.concatenate([[0], cuts[:-1]]), cuts):
+                mask[order[previous:cut]] = True
+                prefixes.append(np.packbits(mask))
+            self.sorted[column] = (values[order[:finite]], order, cuts, prefixes)
+
+    def empty(self):
+        return np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+
+    def positions_bits(self, positions):
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def category_bits(self, column, names):
+        bits = self.empty()
+        for name in names:
+            if name in self.bitmaps[column]:
+                bits |= self.bitmaps[column][name]
+        return bits
+
+    def range_bits(self, column, low, high):
+        values, order, cuts, prefixes = self.sorted[column]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        # Whole bins inside [start, stop) come from the prefix bitmaps
+        first = np.searchsorted(cuts, start, side="left")
+        last = np.searchsorted(cuts, stop, side="right") - 1
+        if first >= last:
+            return self.positions_bits(order[start:stop])
+        bits = prefixes[last] & ~prefixes[first]
+        edges = np.concatenate([order[start:cuts[first]], order[cuts[last]:stop]])
+        if len(edges):
+            bits |= self.positions_bits(edges)
+        return bits
+
+    def select(self, where):
+        bits = None
+        for column, condition in normalize(where) or ():
+            if column in CATEGORY_COLUMNS:
+                part = self.category_bits(column, condition)
+            else:
+                part = self.range_bits(column, *condition)
+            bits = part if bits is None else bits & part
+        if bits is None:
+            return np.arange(self.rows)
+        return np.flatnonzero(np.unpackbits(bits, count=self.rows).view(bool))
+
+
+def get_index():
+    # Rebuilt from scratch when the dataset version changes, appends included
+    with _lock:
+        if _index["version"] != Dataset.version:
+            _index.update(version=Dataset.version,
+                          index=FilterIndex(Dataset.get_df(CATEGORY_COLUMNS + RANGE_COLUMNS)))
+            _selections.clear()
+        return _index["index"]
+
+
+def rows(where):
+    # Positions of the rows matching `where`, in dataset order
+    where = normalize(where)
+    with _lock:
+        index = get_index()
+        key = (Dataset.version, where)
+        if key in _selections:
+            _selections.move_to_end(key)
+            return _selections[key]
+        selected = index.select(where)
+        _selections[key] = selected
+        while len(_selections) > SELECTION_CACHE_SIZE:
+            _selections.popitem(last=False)
+        return selected
+
+
+def choices():
+    # Values offered for each categorical column and the bounds of each range
+    # column, for building a filter UI
+    frame = Dataset.get_df(CATEGORY_COLUMNS + RANGE_COLUMNS)
+    options = {}
+    for column in CATEGORY_COLUMNS:
+        values = frame[column]
+        options[column] = (list(values.cat.categories) if isinstance(values.dtype, pd.CategoricalDtype)
+                           else sorted(values.dropna().unique()))
+    for column in RANGE_COLUMNS:
+        options[column] = (float(frame[column].min()), float(frame[column].max()))
+    return options
@@ -0,0 +1,17 @@
+import Dataset
+import correlation
+import features
+
+
+def update_dataset():
+    # Bring the loaded dataset and the caches derived from it up to date with
+    # the CSV. Returns how many rows were appended, or None when the dataset
+    # had to be reloaded from scratch instead.
+    rows, previous_version = features.append_tail()
+    if rows is None:
+        correlation.invalidate()
+        return None
+    if rows.empty:
+        return 0
+    correlation.append(features.build_features(rows), (Dataset.version, None), (previous_version, None))
+    return len(rows)
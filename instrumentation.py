@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# Opt-in render profiling for the GUI: wall time and peak memory per stage
+# of each render, kept in a rolling log. Memory is measured with tracemalloc,
+# which slows allocation-heavy code down, so none of this runs unless enabled
+# (HEALTHVIZ_PROFILE=1 or `python main.py --profile`).
+PROFILE_ENV = "HEALTHVIZ_PROFILE"
+RENDER_LOG_SIZE = 500
+LOG_FIELDS = ["started", "plot", "version", "stage", "seconds", "peak_mb"]
+
+
+def requested(argv=()):
+    return "--profile" in argv or os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def start():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+class RenderProfile:
+    # Stages may start on one thread and be read on another, but never
+    # overlap: a render moves from the worker to the GUI thread in order.
+
+    def __init__(self, plot, version):
+        self.plot = plot
+        self.version = version
+        self.started = time.time()
+        self.requested = time.perf_counter()
+        self.stages = []
+        self._open = None
+
+    def begin(self, name):
+        base = None
+        if tracemalloc.is_tracing():
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._open = (name, time.perf_counter(), base)
+
+    def end(self):
+        name, started, base = self._open
+        self._open = None
+        peak = None if base is None else max(0, tracemalloc.get_traced_memory()[1] - base)
+        self.stages.append({"stage": name, "seconds": time.perf_counter() - started, "peak_bytes": peak})
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def add(self, name, seconds):
+        self.stages.append({"stage": name, "seconds": seconds, "peak_bytes": None})
+
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages)
+
+    def summary(self):
+        parts = []
+        for stage in self.stages:
+            text = f"{stage['stage']} {stage['seconds'] * 1000:.0f} ms"
+            if stage["peak_bytes"]:
+                text += f" ({stage['peak_bytes'] / 1e6:.1f} MB)"
+            parts.append(text)
+        return f"{self.plot}: " + " · ".join(parts) + f" · total {self.total_seconds() * 1000:.0f} ms"
+
+    def rows(self):
+        started = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started))
+        for stage in self.stages:
+            peak = stage["peak_bytes"]
+            yield {"started": started, "plot": self.plot, "version": self.version, "stage": stage["stage"],
+                   "seconds": round(stage["seconds"], 6), "peak_mb": None if peak is None else round(peak / 1e6, 3)}
+
+
+class RenderLog:
+    def __init__(self, max_entries=RENDER_LOG_SIZE):
+        self.entries = deque(maxlen=max_entries)
+
+    def add(self, profile):
+        self.entries.append(profile)
+
+    def last(self):
+        return self.entries[-1] if self.entries else None
+
+    def export(self, path):
+        # .json: one object per render; anything else: CSV, one row per stage
+        if path.lower().endswith(".json"):
+            renders = [{"plot": profile.plot, "version": profile.version,
+                        "total_seconds": round(profile.total_seconds(), 6), "stages": list(profile.rows())}
+                       for profile in self.entries]
+            with open(path, "w") as f:
+                json.dump(renders, f, indent=2)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+                writer.writeheader()
+                for profile in self.entries:
+                    writer.writerows(profile.rows())
+        return len(self.entries)
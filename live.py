@@ -0,0 +1,230 @@
+import numpy as np
+
+import features
+import kde
+import quantiles
+import registry
+import visualization
+
+# Live mode for a chart on screen. When rows are appended to the dataset,
+# the distribution histograms and the health dashboard are brought up to
+# date by changing the data of the artists already drawn (bar heights,
+# scatter offsets, KDE lines; the density contours and boxes are redrawn
+# within their axes), and only the axes that changed are blitted. The
+# figure is never built again.
+#
+# compute() runs on the render thread. It reads only what the chart
+# captured when it was attached (bin edges, colours, groups) and returns
+# plain arrays. refresh() applies them on the GUI thread. When the new data
+# no longer fits the chart as drawn (values outside the bins, other groups),
+# compute() returns None and the chart has to be rendered again.
+HISTOGRAM_COLUMNS = {
+    "age_distribution": "Age",
+    "bmi_distribution": "BMI",
+    "sleep_distribution": "Hours_of_Sleep",
+    "steps_distribution": "Daily_Steps",
+    "heart_rate_distribution": "Heart_Rate",
+}
+# An axis that has to grow gets this much room beyond the new data, so
+# steady growth does not force a full redraw on every tick
+LIMIT_HEADROOM = 0.1
+
+
+def _grow(ax, axis, low, high):
+    # Widen the axis to show [low, high]; True when its limits changed
+    get_limits, set_limits = (ax.get_xlim, ax.set_xlim) if axis == "x" else (ax.get_ylim, ax.set_ylim)
+    lower, upper = get_limits()
+    if low >= lower and high <= upper:
+        return False
+    margin = (max(high, upper) - min(low, lower)) * LIMIT_HEADROOM
+    set_limits(min(lower, low - margin), max(upper, high + margin))
+    return True
+
+
+class LiveChart:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        # Axes -> the artists updates change, drawn by blitting only
+        self.dynamic = {}
+        # Axes -> its pixels without those artists, from the last full draw
+        self.backgrounds = {}
+        self.connection = None
+
+    def start(self):
+        for artists in self.dynamic.values():
+            for artist in artists:
+                artist.set_animated(True)
+        self.connection = self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.canvas.draw_idle()
+
+    def stop(self):
+        if self.connection is None:
+            return
+        self.canvas.mpl_disconnect(self.connection)
+        self.connection = None
+        self.backgrounds = {}
+        # Back to ordinary artists, so saving the figure includes them
+        for artists in self.dynamic.values():
+            for artist in artists:
+                artist.set_animated(False)
+        # A page off screen (possibly on its way out) keeps its last frame,
+        # which already shows them
+        if self.canvas.isVisible():
+            self.canvas.draw_idle()
+
+    def on_draw(self, event):
+        # Full draws (first show, resize, grown limits) leave animated
+        # artists out: keep the background, then add them on top
+        self.backgrounds = {ax: self.canvas.copy_from_bbox(ax.bbox) for ax in self.dynamic}
+        for ax in self.dynamic:
+            self.draw_dynamic(ax)
+
+    def draw_dynamic(self, ax):
+        for artist in self.dynamic[ax]:
+            ax.draw_artist(artist)
+
+    def replace(self, ax, artists):
+        # For artists that cannot be updated in place: new ones instead
+        for artist in self.dynamic[ax]:
+            artist.remove()
+        for artist in artists:
+            artist.set_animated(True)
+        self.dynamic[ax] = list(artists)
+
+    def refresh(self, update):
+        changed, grown = self.apply(update)
+        if grown or len(self.backgrounds) != len(self.dynamic):
+            self.canvas.draw_idle()
+            return
+        for ax in changed:
+            self.canvas.restore_region(self.backgrounds[ax])
+            self.draw_dynamic(ax)
+            self.canvas.blit(ax.bbox)
+
+
+class HistogramLive(LiveChart):
+    def __init__(self, canvas, column):
+        super().__init__(canvas)
+        self.column = column
+        self.ax = self.figure.axes[0]
+        self.bars = sorted(self.ax.patches, key=lambda bar: bar.get_x())
+        if not self.bars:
+            raise ValueError("No histogram bars to update")
+        self.edges = np.array([bar.get_x() for bar in self.bars] + [self.bars[-1].get_x() + self.bars[-1].get_width()])
+        self.line = self.ax.lines[0] if self.ax.lines else None
+        self.dynamic = {self.ax: self.bars + ([self.line] if self.line is not None else [])}
+
+    def compute(self, where):
+        values = features.get_features([self.column], where)[self.column].to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values)]
+        # Bins stay as first drawn; the edges went through float sums
+        slack = (self.edges[-1] - self.edges[0]) * 1e-9
+        if len(values) and (values.min() < self.edges[0] - slack or values.max() > self.edges[-1] + slack):
+            return None
+        counts, _ = np.histogram(np.clip(values, self.edges[0], self.edges[-1]), self.edges)
+        curve = None
+        estimate = kde.kde_1d(values, cut=0)
+        if estimate is not None:
+            grid, density = estimate
+            curve = (grid, density * (counts * np.diff(self.edges)).sum())
+        return {"counts": counts, "curve": curve}
+
+    def apply(self, update):
+        for bar, count in zip(self.bars, update["counts"]):
+            bar.set_height(count)
+        top = update["counts"].max(initial=0)
+        if self.line is not None and update["curve"] is not None:
+            self.line.set_data(*update["curve"])
+            top = max(top, update["curve"][1].max())
+        return [self.ax], _grow(self.ax, "y", 0, top)
+
+
+class DashboardLive(LiveChart):
+    # The three panels of plot_health_dashboard: Age vs BMI scatter, sleep
+    # vs exercise density, daily steps boxes
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.columns = registry.get("health_dashboard").columns
+        self.scatter_ax, self.density_ax, self.box_ax = self.figure.axes[:3]
+        self.scatter = self.scatter_ax.collections[0]
+        legend = self.scatter_ax.get_legend()
+        if legend is None:
+            raise ValueError("No legend to take the group colours from")
+        self.colors = {text.get_text(): handle.get_markerfacecolor()
+                       for text, handle in zip(legend.get_texts(), legend.legend_handles)}
+        self.box_positions = list(self.box_ax.get_xticks())
+        self.box_labels = [label.get_text() for label in self.box_ax.get_xticklabels()]
+        self.box_colors = [box.get_facecolor() for box in self.box_ax.patches]
+        self.dynamic = {
+            # The legend sits over the points, so it is redrawn after them
+            self.scatter_ax: [self.scatter, legend],
+            self.density_ax: list(self.density_ax.collections),
+            self.box_ax: list(self.box_ax.patches) + list(self.box_ax.lines),
+        }
+
+    def compute(self, where):
+        df = features.get_features(self.columns, where)
+        sample = visualization.stratified_sample(df, "Gender")
+        genders = sample["Gender"].astype(str).to_numpy()
+        if not set(genders) <= set(self.colors):
+            return None
+        stats = quantiles.group_box_stats(df, "Gender", "Daily_Steps")
+        if [entry["label"] for entry in stats] != self.box_labels:
+            return None
+        return {
+            "offsets": sample[["Age", "BMI"]].to_numpy(dtype=np.float64),
+            "colors": [self.colors[gender] for gender in genders],
+            "density": kde.kde_2d(df["Hours_of_Sleep"].to_numpy(), df["Exercise_Hours_per_Week"].to_numpy()),
+            "boxes": stats,
+        }
+
+    def apply(self, update):
+        grown = False
+        offsets = update["offsets"]
+        self.scatter.set_offsets(offsets)
+        self.scatter.set_facecolor(update["colors"])
+        if len(offsets):
+            low, high = np.nanmin(offsets, axis=0), np.nanmax(offsets, axis=0)
+            grown |= _grow(self.scatter_ax, "x", low[0], high[0])
+            grown |= _grow(self.scatter_ax, "y", low[1], high[1])
+
+        if update["density"] is not None:
+            grid_x, grid_y, density = update["density"]
+            limits = self.density_ax.get_xlim(), self.density_ax.get_ylim()
+            contours = self.density_ax.contourf(grid_x, grid_y, density, levels=kde.density_levels(density),
+                                                cmap="Purples", extend="max")
+            self.density_ax.set_xlim(limits[0])
+            self.density_ax.set_ylim(limits[1])
+            self.replace(self.density_ax, [contours])
+
+        # Boxes are redrawn where seaborn put them, in the same colours
+        stats = update["boxes"]
+        limits = self.box_ax.get_xlim(), self.box_ax.get_ylim()
+        artists = self.box_ax.bxp(stats, positions=self.box_positions, widths=0.8, patch_artist=True,
+                                  manage_ticks=False, medianprops={"color": "0.25"},
+                                  whiskerprops={"color": "0.25"}, capprops={"color": "0.25"},
+                                  boxprops={"edgecolor": "0.25"},
+                                  flierprops={"marker": "d", "markerfacecolor": "0.25", "markeredgecolor": "0.25",
+                                              "markersize": 4})
+        for box, color in zip(artists["boxes"], self.box_colors):
+            box.set_facecolor(color)
+        self.box_ax.set_xlim(limits[0])
+        self.box_ax.set_ylim(limits[1])
+        self.replace(self.box_ax, [artist for group in artists.values() for artist in group])
+        low = min(min(entry["whislo"], entry["fliers"].min(initial=entry["whislo"])) for entry in stats)
+        high = max(max(entry["whishi"], entry["fliers"].max(initial=entry["whishi"])) for entry in stats)
+        grown |= _grow(self.box_ax, "y", low, high)
+        return [self.scatter_ax, self.density_ax, self.box_ax], grown
+
+
+def create(plot_id, canvas):
+    # Live chart for a page showing `plot_id`, or None if it has no live mode
+    try:
+        if plot_id in HISTOGRAM_COLUMNS:
+            return HistogramLive(canvas, HISTOGRAM_COLUMNS[plot_id])
+        if plot_id == "health_dashboard":
+            return DashboardLive(canvas)
+    except (ValueError, IndexError):
+        pass
+    return None
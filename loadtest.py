@@ -0,0 +1,131 @@
+import argparse
+import gc
+import http.client
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import registry
+import server
+
+# Throughput of the chart service for each way a request can be answered.
+# The service runs in this process on a free port; `--clients` threads send
+# requests over keep-alive connections.
+#
+#   render   caches emptied before every round: each chart is drawn
+#   disk     memory cache emptied before every round: read from files
+#   memory   served from the in-memory cache
+#   304      If-None-Match with the current ETag: no body at all
+PHASES = ("render", "disk", "memory", "304")
+
+
+def fetch(port, paths, clients, etags=None):
+    # Every path once, spread over `clients` connections. Returns
+    # (status, seconds, X-Chart-Source) per request and the response ETags.
+    results = []
+    tags = {}
+    lock = threading.Lock()
+
+    def client(share):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        try:
+            for path in share:
+                headers = {"If-None-Match": etags[path]} if etags else {}
+                started = time.perf_counter()
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                seconds = time.perf_counter() - started
+                with lock:
+                    results.append((response.status, seconds, response.getheader("X-Chart-Source")))
+                    tags[path] = response.getheader("ETag")
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=client, args=(paths[start::clients],)) for start in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, tags
+
+
+def run_phase(name, service, port, paths, clients, rounds):
+    results = []
+    seconds = 0.0
+    etags = None
+    if name == "304":
+        etags = fetch(port, paths, clients)[1]
+    # Garbage from earlier phases (thousands of artists) is not this phase's cost
+    gc.collect()
+    for _ in range(rounds):
+        if name == "render":
+            service.cache.clear()
+        elif name == "disk":
+            service.cache.clear(disk=False)
+        started = time.perf_counter()
+        round_results, _ = fetch(port, paths, clients, etags)
+        seconds += time.perf_counter() - started
+        results.extend(round_results)
+
+    expected = {"render": (200, "render"), "disk": (200, "disk"), "memory": (200, "memory"), "304": (304, None)}[name]
+    unexpected = sum(1 for status, _, source in results if (status, source) != expected)
+    latencies = np.array([latency for _, latency, _ in results]) * 1000
+    return {"phase": name, "requests": len(results), "seconds": seconds, "per_second": len(results) / seconds,
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+            "unexpected": unexpected}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure chart service throughput for cache hits and misses.")
+    parser.add_argument("plots", nargs="*", help="plot ids to request (default: every non-heavy plot)")
+    parser.add_argument("-c", "--clients", type=int, default=8, help="concurrent client connections (default: 8)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="render threads in the service")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="times every chart is requested per phase")
+    parser.add_argument("-f", "--format", choices=("png", "svg"), default="png")
+    parser.add_argument("--where", default="", help="query string filter, e.g. 'Smoker=Yes&Age=50,70'")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=list(PHASES))
+    args = parser.parse_args(argv)
+
+    try:
+        plot_ids = [registry.get(name).id for name in args.plots] or [
+            spec.id for spec in registry.PLOTS if spec.cost != "heavy"]
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+    query = f"?{args.where}" if args.where else ""
+    paths = [f"/plots/{plot_id}.{args.format}{query}" for plot_id in plot_ids]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = server.ChartService(server.ChartCache(cache_dir), args.workers)
+        httpd = server.make_server(service, port=0)
+        port = httpd.server_address[1]
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        try:
+            # Load the data once so the render phase measures drawing
+            results, _ = fetch(port, paths, args.clients)
+            failed = [status for status, _, _ in results if status != 200]
+            if failed:
+                raise SystemExit(f"{len(failed)} of {len(paths)} charts failed (HTTP {failed[0]})")
+            print(f"{len(paths)} charts, {args.clients} clients, {service.renderer.workers} render threads")
+            print(f"{'phase':8} {'requests':>8} {'seconds':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+            unexpected = 0
+            for name in args.phases:
+                row = run_phase(name, service, port, paths, args.clients, args.rounds)
+                unexpected += row["unexpected"]
+                print(f"{row['phase']:8} {row['requests']:>8} {row['seconds']:>8.2f} {row['per_second']:>9.1f} "
+                      f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}")
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            service.shutdown()
+    if unexpected:
+        print(f"{unexpected} responses did not come from the expected source")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Box plot statistics without sorting the data.
+#
+# With the values in memory, exact_box_stats selects the quartiles with
+# np.partition (linear time, the same values matplotlib and seaborn compute)
+# and finds whiskers and outliers in the parts below q1 and above q3.
+#
+# For data seen in chunks (streaming.py) there are mergeable KLL quantile
+# sketches. A sketch takes values in blocks of UPDATE_BLOCK, keeps
+# O(k log(n/k)) of them and answers quantile queries with a rank error of
+# about 1/k. Sketches built over separate chunks or in separate processes
+# merge into the sketch of the combined data.
+#
+# From BOXPLOT_STATS_MIN_ROWS rows, _boxplot in visualization.py draws the
+# exact statistics with Axes.bxp instead of calling sns.boxplot. Building and
+# drawing two groups on one core (`python quantiles.py`, which also compares
+# the sketch with np.quantile):
+#
+#   rows          1k     20k    100k     1M
+#   sns.boxplot  50 ms  74 ms  143 ms  920 ms
+#   bxp          32 ms  38 ms   43 ms   86 ms
+#
+# Up to about 20k rows the difference is seaborn's fixed overhead, and its
+# own styling is kept; beyond that it grows with the rows.
+BOXPLOT_STATS_MIN_ROWS = 20_000
+SKETCH_K = 400
+# Values an update puts on level 0 at a time. Compacting after every block
+# sorts O(UPDATE_BLOCK) items each time, so a batch of n costs
+# O(n log UPDATE_BLOCK) rather than a sort of the whole batch.
+UPDATE_BLOCK = 16_384
+# Each level below the top holds this fraction of the items of the one above
+LEVEL_DECAY = 2 / 3
+WHISKER_IQR = 1.5
+
+
+class KLLSketch:
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.levels = []
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels)
+        return max(2, int(np.ceil(self.k * LEVEL_DECAY ** (depth - 1 - level))))
+
+    def _add(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _compress(self):
+        # Halve any level over capacity: sort it, keep every other item from
+        # a random offset and promote those to the next level at twice the
+        # weight. An odd item out stays behind.
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                items = np.sort(items)
+                odd = len(items) % 2
+                self.levels[level] = items[len(items) - odd:]
+                self._add(level + 1, items[self._rng.integers(2):len(items) - odd:2])
+                compacted = True
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        for start in range(0, len(values), UPDATE_BLOCK):
+            self._add(0, values[start:start + UPDATE_BLOCK])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def items(self):
+        # Retained items in order, each with the number of values it stands for
+        items = np.concatenate(self.levels) if self.levels else np.empty(0)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)]
+                                 ) if self.levels else np.empty(0)
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantile(self, quantiles):
+        quantiles = np.atleast_1d(np.asarray(quantiles, dtype=np.float64))
+        if not self.count:
+            return np.full(len(quantiles), np.nan)
+        items, weights = self.items()
+        cumulative = np.cumsum(weights)
+        positions = np.searchsorted(cumulative, quantiles * cumulative[-1], side="left")
+        result = items[np.clip(positions, 0, len(items) - 1)]
+        result[quantiles <= 0] = self.min
+        result[quantiles >= 1] = self.max
+        return result
+
+
+def box_stats(label, sketch):
+    # Stats in the form Axes.bxp draws, from a sketch alone: quartiles and
+    # whiskers are approximate and there are no fliers
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    low_fence = q1 - WHISKER_IQR * (q3 - q1)
+    high_fence = q3 + WHISKER_IQR * (q3 - q1)
+    items, _ = sketch.items()
+    whislo = sketch.min if sketch.min >= low_fence else items[items >= low_fence].min(initial=q1)
+    whishi = sketch.max if sketch.max <= high_fence else items[items <= high_fence].max(initial=q3)
+    return {"label": label, "med": median, "q1": q1, "q3": q3,
+            "whislo": min(whislo, q1), "whishi": max(whishi, q3), "fliers": np.empty(0)}
+
+
+def exact_box_stats(label, values):
+    # The same stats from finite values, as matplotlib's boxplot_stats
+    # computes them (quartiles interpolated linearly), without a sort.
+    # np.partition puts the order statistics the quartiles need in place,
+    # with everything smaller before them and everything larger after, so
+    # low outliers can only be before the one just above q1 and high ones
+    # after the one just below q3.
+    positions = np.array([0.25, 0.5, 0.75]) * (len(values) - 1)
+    below = np.floor(positions).astype(np.intp)
+    above = np.ceil(positions).astype(np.intp)
+    values = np.partition(values, np.union1d(below, above))
+    q1, median, q3 = values[below] + (values[above] - values[below]) * (positions - below)
+    low_fence = q1 - WHISKER_IQR * (q3 - q1)
+    high_fence = q3 + WHISKER_IQR * (q3 - q1)
+    lower, upper = values[:above[0]], values[below[2] + 1:]
+    whislo = lower[lower >= low_fence].min(initial=values[above[0]])
+    whishi = upper[upper <= high_fence].max(initial=values[below[2]])
+    # Repeated outliers are drawn as one marker, so each value is kept once
+    fliers = np.unique(np.concatenate([lower[lower < low_fence], upper[upper > high_fence]]))
+    return {"label": label, "med": median, "q1": q1, "q3": q3,
+            "whislo": min(whislo, q1), "whishi": max(whishi, q3), "fliers": fliers}
+
+
+def group_sketches(df, group, column, sketches=None, k=SKETCH_K):
+    # Add df's rows to per-group sketches (a dict, new if not given), in
+    # category order
+    sketches = {} if sketches is None else sketches
+    groups = df[group]
+    if not isinstance(groups.dtype, pd.CategoricalDtype):
+        groups = groups.astype("category")
+    codes = groups.cat.codes.to_numpy()
+    values = df[column].to_numpy(dtype=np.float64)
+    for code, name in enumerate(groups.cat.categories):
+        sketches.setdefault(name, KLLSketch(k, seed=code))
+        sketches[name].update(values[codes == code])
+    return sketches
+
+
+def group_box_stats(df, group, column):
+    groups = df[group]
+    if not isinstance(groups.dtype, pd.CategoricalDtype):
+        groups = groups.astype("category")
+    codes = groups.cat.codes.to_numpy()
+    values = df[column].to_numpy(dtype=np.float64)
+    stats = []
+    for code, name in enumerate(groups.cat.categories):
+        group_values = values[codes == code]
+        group_values = group_values[np.isfinite(group_values)]
+        if len(group_values):
+            stats.append(exact_box_stats(name, group_values))
+    return stats
+
+
+def benchmark(sizes, chunks=8, seed=0):
+    rng = np.random.default_rng(seed)
+    quantiles = np.array([0.25, 0.5, 0.75])
+    results = []
+    for n in sizes:
+        values = np.concatenate([rng.gamma(4, 2, n // 2) + 18, rng.uniform(18, 80, n - n // 2)])
+
+        started = time.perf_counter()
+        exact = np.quantile(values, quantiles)
+        exact_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        sketch = KLLSketch(seed=seed).update(values)
+        estimate = sketch.quantile(quantiles)
+        sketch_seconds = time.perf_counter() - started
+
+        # The same data sketched in chunks and merged, as a streaming or
+        # multi-process run would
+        merged = KLLSketch(seed=seed)
+        for part in np.array_split(values, chunks):
+            merged.merge(KLLSketch(seed=seed).update(part))
+
+        ordered = np.sort(values)
+        rank_error = lambda found: float(np.abs(np.searchsorted(ordered, found) / n - quantiles).max())
+        results.append({
+            "n": n, "exact_seconds": exact_seconds, "sketch_seconds": sketch_seconds,
+            "retained": sum(len(level) for level in sketch.levels),
+            "rank_error": rank_error(estimate), "merged_rank_error": rank_error(merged.quantile(quantiles)),
+            "max_value_error": float(np.abs(estimate - exact).max()),
+        })
+    return results
+
+
+def boxplot_benchmark(sizes, repeat=3, seed=0):
+    # Seconds to build and draw a two-group box plot with sns.boxplot and
+    # with the statistics path of visualization._boxplot (best of `repeat`)
+    import matplotlib
+    matplotlib.use("Agg")
+    import seaborn as sns
+    import figures
+    import visualization
+
+    def timed(draw, df):
+        best = np.inf
+        for _ in range(repeat):
+            fig = figures.acquire((8, 5))
+            started = time.perf_counter()
+            draw(df, fig.add_subplot(111))
+            fig.canvas.draw()
+            best = min(best, time.perf_counter() - started)
+            figures.release(fig)
+        return best
+
+    def seaborn(df, ax):
+        sns.boxplot(x="Gender", y="Daily_Steps", data=df, ax=ax)
+
+    def stats(df, ax):
+        visualization.draw_box_stats(ax, group_box_stats(df, "Gender", "Daily_Steps"))
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in sizes:
+        df = pd.DataFrame({"Gender": pd.Categorical(rng.choice(["Male", "Female"], n), ["Male", "Female"]),
+                           "Daily_Steps": rng.gamma(4, 2000, n).round()})
+        results.append({"n": n, "seaborn_seconds": timed(seaborn, df), "stats_seconds": timed(stats, df)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare KLL sketch quartiles with exact np.quantile, and "
+                                                 "sns.boxplot with box plots drawn from exact_box_stats.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--boxplot-sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'n':>10} {'exact s':>9} {'sketch s':>9} {'kept':>6} {'rank err':>9} {'merged':>9} {'value err':>10}")
+    for row in benchmark(args.sizes):
+        print(f"{row['n']:>10,} {row['exact_seconds']:>9.3f} {row['sketch_seconds']:>9.3f} {row['retained']:>6} "
+              f"{row['rank_error']:>9.2e} {row['merged_rank_error']:>9.2e} {row['max_value_error']:>10.3f}")
+
+    print()
+    print(f"{'n':>10} {'seaborn s':>10} {'bxp s':>9}")
+    for row in boxplot_benchmark(args.boxplot_sizes):
+        print(f"{row['n']:>10,} {row['seaborn_seconds']:>10.3f} {row['stats_seconds']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
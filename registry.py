@@ -0,0 +1,126 @@
+from collections import OrderedDict, namedtuple
+
+# Central list of every chart. It is plain data so the GUI, menu, export and
+# benchmark tools can see what each plot needs without importing
+# visualization (and with it seaborn and the dataset).
+#
+# columns: dataset or features.py derived columns the plot reads,
+#          or ALL_COLUMNS when it works on every numeric column of the
+#          dataset itself (derived columns are not included).
+# cost:    rough render cost on the stock dataset: "light", "medium" or "heavy".
+PlotSpec = namedtuple("PlotSpec", ["id", "title", "category", "function", "columns", "cost"])
+
+ALL_COLUMNS = None
+
+CATEGORIES = [
+    "Basic Distributions",
+    "Comparative Analysis",
+    "Correlation Analysis",
+    "Multivariate Analysis",
+    "Advanced Visualizations",
+]
+
+PLOTS = [
+    PlotSpec("age_distribution", "Age Distribution", "Basic Distributions",
+             "plot_age_distribution", ("Age",), "light"),
+    PlotSpec("bmi_distribution", "BMI Distribution", "Basic Distributions",
+             "plot_bmi_distribution", ("BMI",), "light"),
+    PlotSpec("sleep_distribution", "Sleep Hours Distribution", "Basic Distributions",
+             "plot_sleep_distribution", ("Hours_of_Sleep",), "light"),
+    PlotSpec("steps_distribution", "Daily Steps Distribution", "Basic Distributions",
+             "plot_steps_distribution", ("Daily_Steps",), "light"),
+    PlotSpec("heart_rate_distribution", "Heart Rate Distribution", "Basic Distributions",
+             "plot_heart_rate_distribution", ("Heart_Rate",), "light"),
+
+    PlotSpec("bmi_by_gender", "BMI by Gender", "Comparative Analysis",
+             "plot_bmi_by_gender", ("Gender", "BMI"), "light"),
+    PlotSpec("exercise_by_smoker", "Exercise Hours by Smoker Status", "Comparative Analysis",
+             "plot_exercise_by_smoker", ("Smoker", "Exercise_Hours_per_Week"), "light"),
+    PlotSpec("sleep_by_age_group", "Sleep by Age Group", "Comparative Analysis",
+             "plot_sleep_by_age_group", ("Age_Group", "Hours_of_Sleep"), "light"),
+    PlotSpec("alcohol_kde_by_gender", "Alcohol Consumption by Gender", "Comparative Analysis",
+             "plot_alcohol_kde_by_gender", ("Alcohol_Consumption_per_Week", "Gender"), "medium"),
+    PlotSpec("heart_rate_by_diabetic", "Heart Rate by Diabetic Status", "Comparative Analysis",
+             "plot_heart_rate_by_diabetic", ("Diabetic", "Heart_Rate"), "light"),
+    PlotSpec("bmi_vs_smoker_by_gender", "BMI by Smoker Status and Gender", "Comparative Analysis",
+             "plot_bmi_vs_smoker_by_gender", ("Smoker", "BMI", "Gender"), "heavy"),
+
+    PlotSpec("health_metrics_heatmap", "Health Metrics Heatmap", "Correlation Analysis",
+             "plot_health_metrics_heatmap",
+             ("BMI", "Heart_Rate", "Systolic", "Diastolic", "Hours_of_Sleep", "Exercise_Hours_per_Week"),
+             "light"),
+    PlotSpec("lifestyle_vital_correlation", "Lifestyle vs Vitals Correlation", "Correlation Analysis",
+             "plot_lifestyle_vital_correlation",
+             ("Daily_Steps", "Calories_Intake", "Exercise_Hours_per_Week", "Alcohol_Consumption_per_Week",
+              "Heart_Rate", "Systolic", "Diastolic", "BMI"),
+             "light"),
+    PlotSpec("clustermap", "Clustermap of All Variables", "Correlation Analysis",
+             "plot_clustermap", ALL_COLUMNS, "heavy"),
+    PlotSpec("age_health_correlation", "Age vs Health Indicators Correlation", "Correlation Analysis",
+             "plot_age_health_correlation",
+             ("Age", "BMI", "Heart_Rate", "Hours_of_Sleep", "Exercise_Hours_per_Week"), "light"),
+    PlotSpec("exercise_impact_correlation", "Exercise Impact Analysis", "Correlation Analysis",
+             "plot_exercise_impact_correlation",
+             ("Exercise_Hours_per_Week", "BMI", "Heart_Rate", "Hours_of_Sleep", "Daily_Steps"), "light"),
+    PlotSpec("heatmap", "Correlation Heatmap", "Correlation Analysis",
+             "plot_heatmap", ALL_COLUMNS, "medium"),
+    PlotSpec("advanced_correlation_heatmap", "Advanced Correlation Heatmap", "Correlation Analysis",
+             "plot_advanced_correlation_heatmap", ALL_COLUMNS, "medium"),
+
+    PlotSpec("steps_vs_bmi", "Daily Steps vs BMI", "Multivariate Analysis",
+             "plot_steps_vs_bmi", ("Daily_Steps", "BMI", "Gender"), "light"),
+    PlotSpec("bmi_vs_age", "BMI vs Age Scatter", "Multivariate Analysis",
+             "plot_bmi_vs_age", ("Age", "BMI"), "light"),
+    PlotSpec("alcohol_vs_heart_rate", "Alcohol vs Heart Rate", "Multivariate Analysis",
+             "plot_alcohol_vs_heart_rate", ("Alcohol_Consumption_per_Week", "Heart_Rate"), "medium"),
+    PlotSpec("sleep_vs_exercise", "Sleep vs Exercise Hours", "Multivariate Analysis",
+             "plot_sleep_vs_exercise", ("Hours_of_Sleep", "Exercise_Hours_per_Week", "Gender", "Age"), "light"),
+    PlotSpec("calories_vs_weight", "Calorie Intake vs Weight", "Multivariate Analysis",
+             "plot_calories_vs_weight", ("Calories_Intake", "Weight_kg", "Gender", "Smoker", "Age"), "light"),
+    PlotSpec("facetgrid_steps_vs_bmi", "FacetGrid: Daily Steps vs BMI by Gender", "Multivariate Analysis",
+             "plot_facetgrid_steps_vs_bmi", ("Gender", "Daily_Steps", "BMI"), "medium"),
+    PlotSpec("pairplot", "Pairplot of Numeric Features", "Multivariate Analysis",
+             "plot_pairplot", ALL_COLUMNS, "heavy"),
+
+    PlotSpec("facetgrid_metrics_by_gender", "FacetGrid: Health Metrics by Gender", "Advanced Visualizations",
+             "plot_facetgrid_metrics_by_gender", ("Gender", "BMI", "Heart_Rate", "Smoker", "Age"), "medium"),
+    PlotSpec("health_radar_chart", "Health Radar Chart", "Advanced Visualizations",
+             "plot_health_radar_chart",
+             ("ID", "BMI", "Daily_Steps", "Hours_of_Sleep", "Heart_Rate", "Exercise_Hours_per_Week"), "light"),
+    PlotSpec("radar_chart", "Individual Radar Profile", "Advanced Visualizations",
+             "plot_radar_chart",
+             ("ID", "BMI", "Daily_Steps", "Hours_of_Sleep", "Heart_Rate", "Exercise_Hours_per_Week",
+              "Alcohol_Consumption_per_Week"), "light"),
+    PlotSpec("health_dashboard", "Comprehensive Health Dashboard", "Advanced Visualizations",
+             "plot_health_dashboard",
+             ("Age", "BMI", "Gender", "Hours_of_Sleep", "Exercise_Hours_per_Week", "Daily_Steps"), "heavy"),
+    PlotSpec("risk_factors_sunburst", "Risk Factors Sunburst Chart", "Advanced Visualizations",
+             "plot_risk_factors_sunburst", ("Gender", "Smoker", "BMI_Category"), "light"),
+    PlotSpec("sunburst", "Health Risk Sunburst Chart", "Advanced Visualizations",
+             "plot_sunburst", ("Gender", "Smoker", "Health_Risk"), "light"),
+    PlotSpec("3d_health_analysis", "3D Analysis: Age-BMI-Heart Rate", "Advanced Visualizations",
+             "plot_3d_health_analysis", ("Age", "BMI", "Heart_Rate", "Gender"), "medium"),
+]
+
+_by_id = {spec.id: spec for spec in PLOTS}
+
+
+def get(plot_id):
+    if plot_id.startswith("plot_"):
+        plot_id = plot_id[len("plot_"):]
+    try:
+        return _by_id[plot_id]
+    except KeyError:
+        raise KeyError(f"Unknown plot: {plot_id}") from None
+
+
+def by_category():
+    grouped = OrderedDict((category, []) for category in CATEGORIES)
+    for spec in PLOTS:
+        grouped[spec.category].append(spec)
+    return grouped
+
+
+def load(spec):
+    import visualization
+    return getattr(visualization, spec.function)
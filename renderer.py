@@ -0,0 +1,115 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Headless: select Agg before anything imports pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import figures
+import registry
+
+# Many charts drawn at once in one process. The plots never go through
+# pyplot's current figure: each one draws on its own figure from figures.py
+# through the Axes it was given, so worker threads do not share any figure
+# state. The data caches they read (Dataset, features, filters, correlation)
+# are guarded by locks.
+FORMATS = ("png", "svg")
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def render(plot_id, where=None, format="png", dpi=100):
+    # One chart as image bytes; `where` filters the rows (see filters.py)
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format: {format}")
+    fig = registry.load(registry.get(plot_id))(where=where)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=format, dpi=dpi, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        figures.release(fig)
+
+
+class Renderer:
+    def __init__(self, workers=None):
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+
+    def submit(self, plot_id, where=None, format="png", dpi=100):
+        return self.executor.submit(render, plot_id, where, format, dpi)
+
+    def render_many(self, plot_ids, where=None, format="png", dpi=100):
+        # Yields (plot_id, image bytes or the exception raised) as charts finish
+        futures = {self.submit(plot_id, where, format, dpi): plot_id for plot_id in plot_ids}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], future.result() if error is None else error
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render charts on a pool of threads and compare with "
+                                                 "rendering them one after another.")
+    parser.add_argument("plots", nargs="*", help="plot ids or plot_* function names (default: every non-heavy plot)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="render threads (default: CPU count, at most 8)")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="render every chart this many times")
+    parser.add_argument("-o", "--out", help="also write the images to this directory")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="png")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--where", type=json.loads, default=None,
+                        help='row filter as JSON, e.g. \'{"Smoker": ["Yes"], "Age": [50, 70]}\'')
+    parser.add_argument("--no-serial", action="store_true", help="skip the single-thread comparison run")
+    args = parser.parse_args(argv)
+
+    try:
+        plot_ids = [registry.get(name).id for name in args.plots] or [
+            spec.id for spec in registry.PLOTS if spec.cost != "heavy"]
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+    jobs = plot_ids * args.repeat
+
+    # Load the data and warm the caches so both runs only measure drawing
+    for plot_id in plot_ids:
+        render(plot_id, args.where, args.format, args.dpi)
+
+    if not args.no_serial:
+        started = time.perf_counter()
+        for plot_id in jobs:
+            render(plot_id, args.where, args.format, args.dpi)
+        serial = time.perf_counter() - started
+        print(f"serial:     {len(jobs)} charts in {serial:.2f}s ({len(jobs) / serial:.1f} charts/s)")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    failed = 0
+    with Renderer(args.workers) as renderer:
+        started = time.perf_counter()
+        for plot_id, result in renderer.render_many(jobs, args.where, args.format, args.dpi):
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"error {plot_id}: {type(result).__name__}: {result}")
+            elif args.out:
+                with open(os.path.join(args.out, f"{plot_id}.{args.format}"), "wb") as f:
+                    f.write(result)
+        threaded = time.perf_counter() - started
+    print(f"{renderer.workers} threads: {len(jobs)} charts in {threaded:.2f}s ({len(jobs) / threaded:.1f} charts/s)")
+    if not args.no_serial:
+        print(f"Speed-up: {serial / threaded:.2f}x")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
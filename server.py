@@ -0,0 +1,349 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Headless: select Agg before anything imports pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import Dataset
+import filters
+import registry
+import renderer
+
+# Charts over HTTP, for embedding in dashboards:
+#
+#   GET /plots                    JSON list of the plots and their URLs
+#   GET /plots/<id>.png           the chart (also .svg). Query parameters
+#                                 filter rows (see filters.py): Smoker=Yes,
+#                                 Gender=Male,Female, Age=30,60 or Age=30,
+#                                 for an open end; dpi= sets the resolution.
+#   GET /stats                    cache and render counters
+#
+# Responses are cached in memory and on disk under the key (plot, dataset,
+# filter, format, dpi). The dataset part is what Dataset holds in memory:
+# the CSV's path, its size and mtime when first read, and the rows loaded
+# since (see Dataset.loaded_state), so files on disk outlive restarts but
+# not changes to the data. The ETag is a hash of that key: a matching
+# If-None-Match gets a 304 without rendering or reading anything.
+MEMORY_CACHE_BYTES = 64 * 2 ** 20
+DISK_CACHE_BYTES = 512 * 2 ** 20
+DEFAULT_DPI = 100
+MAX_DPI = 300
+
+
+class ChartCache:
+    def __init__(self, directory=None, memory_bytes=MEMORY_CACHE_BYTES, disk_bytes=DISK_CACHE_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        # etag -> body, least recently used first
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, etag, format):
+        return os.path.join(self.directory, f"{etag}.{format}")
+
+    def get(self, etag, format):
+        # (body, "memory" or "disk"), or (None, None)
+        with self._lock:
+            if etag in self.memory:
+                self.memory.move_to_end(etag)
+                self.hits["memory"] += 1
+                return self.memory[etag], "memory"
+        if not self.directory:
+            return None, None
+        try:
+            with open(self.path(etag, format), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None, None
+        # Touched so pruning drops the least recently used files
+        os.utime(self.path(etag, format))
+        with self._lock:
+            self._remember(etag, body)
+            self.hits["disk"] += 1
+        return body, "disk"
+
+    def put(self, etag, format, body):
+        with self._lock:
+            self._remember(etag, body)
+        if not self.directory:
+            return
+        path = self.path(etag, format)
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(body)
+        os.replace(partial, path)
+        self._prune_disk()
+
+    def _remember(self, etag, body):
+        if etag in self.memory:
+            self.memory_size -= len(self.memory.pop(etag))
+        self.memory[etag] = body
+        self.memory_size += len(body)
+        while self.memory_size > self.memory_bytes and len(self.memory) > 1:
+            self.memory_size -= len(self.memory.popitem(last=False)[1])
+
+    def _prune_disk(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self, memory=True, disk=True):
+        with self._lock:
+            if memory:
+                self.memory.clear()
+                self.memory_size = 0
+        if disk and self.directory:
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        with self._lock:
+            return {"memory_entries": len(self.memory), "memory_bytes": self.memory_size,
+                    "memory_hits": self.hits["memory"], "disk_hits": self.hits["disk"]}
+
+
+class ChartService:
+    def __init__(self, cache, workers=None):
+        self.cache = cache
+        self.renderer = renderer.Renderer(workers)
+        # etag -> future of a render in progress, shared by concurrent misses
+        self.pending = {}
+        self.renders = 0
+        self._dataset = {"version": None, "tag": None}
+        self._lock = threading.Lock()
+
+    def dataset_tag(self):
+        with self._lock:
+            if self._dataset["version"] != Dataset.version:
+                version = Dataset.version
+                state = Dataset.loaded_state()
+                if state is None:
+                    # Describe the data the renders will see, not the file
+                    Dataset.get_df(Dataset.all_columns()[:1])
+                    state = Dataset.loaded_state()
+                source = state["source"]
+                self._dataset.update(version=version, tag=f"{state['path']}:{source['size']}:"
+                                                          f"{source['mtime_ns']}:{state['rows']}")
+            return self._dataset["tag"]
+
+    def etag(self, plot_id, where, format, dpi):
+        key = json.dumps([plot_id, self.dataset_tag(), where, format, dpi])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def chart(self, plot_id, where=None, format="png", dpi=DEFAULT_DPI):
+        # (etag, body, where it came from: "memory", "disk" or "render")
+        version = Dataset.version
+        etag = self.etag(plot_id, where, format, dpi)
+        body, source = self.cache.get(etag, format)
+        if body is not None:
+            return etag, body, source
+        with self._lock:
+            future = self.pending.get(etag)
+            owner = future is None
+            if owner:
+                future = self.renderer.submit(plot_id, where, format, dpi)
+                self.pending[etag] = future
+                self.renders += 1
+        try:
+            body = future.result()
+        finally:
+            if owner:
+                with self._lock:
+                    self.pending.pop(etag, None)
+        # Rows appended during the render may be in it; it is not what the
+        # etag describes, so it is served but not kept
+        if owner and Dataset.version == version:
+            self.cache.put(etag, format, body)
+        return etag, body, "render"
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update(renders=self.renders, rendering=len(self.pending), dataset_version=Dataset.version)
+        return stats
+
+    def shutdown(self):
+        self.renderer.shutdown()
+
+
+def parse_query(query):
+    # parse_qs() result -> (dpi, normalized filter); ValueError on bad input
+    dpi = DEFAULT_DPI
+    where = {}
+    for name, values in query.items():
+        value = ",".join(values)
+        if name == "dpi":
+            dpi = int(value)
+            if not 10 <= dpi <= MAX_DPI:
+                raise ValueError(f"dpi must be between 10 and {MAX_DPI}")
+        elif name in filters.CATEGORY_COLUMNS:
+            where[name] = [item for item in value.split(",") if item]
+        elif name in filters.RANGE_COLUMNS:
+            low, comma, high = value.partition(",")
+            if not comma:
+                raise ValueError(f"{name} takes low,high (either may be empty)")
+            where[name] = (float(low) if low else None, float(high) if high else None)
+        else:
+            raise ValueError(f"Unknown parameter: {name}")
+    return dpi, filters.normalize(where)
+
+
+class ChartHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "Healthviz"
+    # Headers and body go out as separate writes; don't let them wait on ACKs
+    disable_nagle_algorithm = True
+    service = None
+    verbose = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/plots":
+            self.send_json([{"id": spec.id, "title": spec.title, "category": spec.category, "cost": spec.cost,
+                             "png": f"/plots/{spec.id}.png", "svg": f"/plots/{spec.id}.svg"}
+                            for spec in registry.PLOTS])
+        elif url.path == "/stats":
+            self.send_json(self.service.stats())
+        elif url.path.startswith("/plots/"):
+            self.send_chart(url.path[len("/plots/"):], parse_qs(url.query, keep_blank_values=True))
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def send_chart(self, name, query):
+        plot_id, _, format = name.rpartition(".")
+        if format not in renderer.FORMATS:
+            self.send_error(HTTPStatus.NOT_FOUND, f"Formats: {', '.join(renderer.FORMATS)}")
+            return
+        try:
+            plot_id = registry.get(plot_id).id
+        except KeyError as e:
+            self.send_error(HTTPStatus.NOT_FOUND, e.args[0])
+            return
+        try:
+            dpi, where = parse_query(query)
+        except (KeyError, ValueError) as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e.args[0]))
+            return
+
+        etag = f'"{self.service.etag(plot_id, where, format, dpi)}"'
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        try:
+            etag, body, source = self.service.chart(plot_id, where, format, dpi)
+        except Exception as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", renderer.CONTENT_TYPES[format])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f'"{etag}"')
+        # Clients revalidate every time: the data behind a URL can change
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Chart-Source", source)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data):
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(service, host="127.0.0.1", port=8050, verbose=False):
+    handler = type("Handler", (ChartHandler,), {"service": service, "verbose": verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def watch_dataset(interval, stop):
+    # Picks up rows appended to the CSV; the new dataset tag retires old entries
+    import hotreload
+
+    while not stop.wait(interval):
+        try:
+            added = hotreload.update_dataset()
+        except Exception as e:
+            print(f"Dataset update failed: {type(e).__name__}: {e}")
+            continue
+        if added != 0:
+            print(f"Dataset changed (version {Dataset.version})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the charts as PNG/SVG over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="render threads (default: CPU count, at most 8)")
+    parser.add_argument("--cache-dir", default=".chart-cache", help="on-disk response cache (default: .chart-cache)")
+    parser.add_argument("--no-disk-cache", action="store_true")
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_CACHE_BYTES / 2 ** 20)
+    parser.add_argument("--disk-mb", type=float, default=DISK_CACHE_BYTES / 2 ** 20)
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="check the CSV for appended rows this often")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    cache = ChartCache(None if args.no_disk_cache else args.cache_dir,
+                       int(args.memory_mb * 2 ** 20), int(args.disk_mb * 2 ** 20))
+    service = ChartService(cache, args.workers)
+    server = make_server(service, args.host, args.port, args.verbose)
+    stop = threading.Event()
+    if args.watch:
+        threading.Thread(target=watch_dataset, args=(args.watch, stop), daemon=True).start()
+    print(f"Serving {len(registry.PLOTS)} charts on http://{args.host}:{server.server_address[1]}/plots "
+          f"({service.renderer.workers} render threads)")
+    started = time.perf_counter()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        service.shutdown()
+    print(f"Stopped after {time.perf_counter() - started:.0f}s: {service.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import gc
+import os
+import sys
+import time
+
+# Long-session check for figure leaks: drives the real GUI (offscreen unless
+# a platform is set) through many chart switches and samples the process
+# memory and the number of live matplotlib figures as it goes. Memory should
+# level off once the figure cache and pool are full.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+# GUI first: it selects the Agg backend before anything imports matplotlib
+import GUI
+import figures
+import registry
+
+
+def rss_mb():
+    # Resident set size; Linux reports it in /proc, elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def live_figures():
+    from matplotlib.figure import Figure
+    import matplotlib.pyplot as plt
+
+    gc.collect()
+    alive = sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+    return alive, len(plt.get_fignums())
+
+
+def wait_for_chart(app, window, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if window.viz_stack.currentWidget() not in (window.loading_state, window.empty_state):
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def run_soak(plot_ids, switches, sample_every, cache_size, timeout):
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = GUI.HealthvizApp(figure_cache_size=cache_size)
+    samples = []
+    started = time.perf_counter()
+    try:
+        for switch in range(1, switches + 1):
+            spec = registry.get(plot_ids[(switch - 1) % len(plot_ids)])
+            window.show_plot(spec)
+            if not wait_for_chart(app, window, timeout):
+                raise SystemExit(f"{spec.id} did not render within {timeout}s")
+            if switch % sample_every == 0 or switch == switches:
+                alive, managed = live_figures()
+                samples.append({"switch": switch, "seconds": time.perf_counter() - started,
+                                "rss_mb": rss_mb(), "figures": alive, "pyplot_figures": managed})
+                print(f"{switch:>6} {samples[-1]['seconds']:>8.1f}s {samples[-1]['rss_mb']:>9.1f} MB "
+                      f"{alive:>8} {managed:>8}")
+    finally:
+        window.close()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Switch between charts in the GUI many times and report "
+                                                 "whether memory and live figures stay flat.")
+    parser.add_argument("plots", nargs="*", help="plot ids to cycle through (default: every non-heavy plot)")
+    parser.add_argument("-n", "--switches", type=int, default=1000)
+    parser.add_argument("--sample-every", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=200,
+                        help="switches before the memory baseline is taken (default: 200)")
+    parser.add_argument("--max-growth-mb", type=float, default=50,
+                        help="fail if memory grows more than this after the warm-up (default: 50)")
+    parser.add_argument("--cache-size", type=int, default=8, help="GUI figure cache size (default: 8)")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for one chart")
+    args = parser.parse_args(argv)
+
+    try:
+        plot_ids = [registry.get(name).id for name in args.plots] or [
+            spec.id for spec in registry.PLOTS if spec.cost != "heavy"]
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+
+    print(f"{'switch':>6} {'time':>9} {'rss':>12} {'figures':>8} {'pyplot':>8}")
+    samples = run_soak(plot_ids, args.switches, args.sample_every, args.cache_size, args.timeout)
+    baseline = next((sample for sample in samples if sample["switch"] >= args.warmup), samples[0])
+    final = samples[-1]
+    growth = final["rss_mb"] - baseline["rss_mb"]
+    # Cached pages, idle pooled figures and the chart in flight
+    figure_limit = args.cache_size + figures.FIGURE_POOL_SIZE + 1
+    print(f"Memory after {baseline['switch']} switches: {baseline['rss_mb']:.1f} MB, "
+          f"after {final['switch']}: {final['rss_mb']:.1f} MB ({growth:+.1f} MB)")
+    print(f"Live figures at the end: {final['figures']} (pyplot: {final['pyplot_figures']})")
+    if growth > args.max_growth_mb or final["figures"] > figure_limit or final["pyplot_figures"] > 0:
+        print("FAIL: memory or figures kept growing")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
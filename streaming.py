@@ -0,0 +1,263 @@
+import argparse
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+import Dataset
+import features
+import figures
+import kde
+import quantiles
+import registry
+from correlation import CorrelationStats, numeric_columns
+
+# Out-of-core mode: the CSV is read in chunks and reduced to the aggregates
+# the plots need, so memory is bounded by the chunk size plus the aggregates,
+# never by the file.
+#
+# Two passes: the first finds the range of each histogram column, the second
+# fills FINE_BINS-bin histograms over that range plus per-group quantile
+# sketches, group counts and correlation statistics. Distribution plots
+# re-bin the fine histograms; box plots come from the merged sketches and
+# draw no fliers.
+CHUNK_ROWS = 250_000
+# Divisible by both bin counts the distribution plots use (15 and 20)
+FINE_BINS = 3840
+
+# plot id -> how to draw it from the aggregates
+STREAMING_PLOTS = {
+    "age_distribution": ("histogram", {"bins": 20, "color": None}),
+    "bmi_distribution": ("histogram", {"bins": 20, "color": "green"}),
+    "sleep_distribution": ("histogram", {"bins": 15, "color": "orange"}),
+    "steps_distribution": ("histogram", {"bins": 20, "color": "purple"}),
+    "heart_rate_distribution": ("histogram", {"bins": 15, "color": "crimson"}),
+    "bmi_by_gender": ("boxplot", {"palette": "Set2"}),
+    "exercise_by_smoker": ("boxplot", {"palette": "Set3"}),
+    "sleep_by_age_group": ("boxplot", {"palette": "viridis"}),
+    "heart_rate_by_diabetic": ("boxplot", {"palette": "RdYlBu"}),
+    "health_metrics_heatmap": ("heatmap", {"cmap": "YlGnBu"}),
+    "lifestyle_vital_correlation": ("heatmap", {"cmap": "coolwarm"}),
+    "age_health_correlation": ("heatmap", {"cmap": "YlOrRd", "lower": True}),
+    "exercise_impact_correlation": ("heatmap", {"cmap": "PuBu"}),
+    "heatmap": ("heatmap", {"cmap": "coolwarm"}),
+    "advanced_correlation_heatmap": ("heatmap", {"cmap": "YlGnBu", "lower": True}),
+    "sunburst": ("sunburst", {}),
+    "risk_factors_sunburst": ("sunburst", {}),
+}
+
+
+class Aggregates:
+    def __init__(self):
+        self.rows = 0
+        self.ranges = {}
+        self.histograms = {}
+        # (group column, value column) -> {group value: KLLSketch}
+        self.sketches = {}
+        # tuple of columns -> Series of counts indexed by their combinations
+        self.group_counts = {}
+        self.categories = {}
+        self.correlation = None
+
+    def edges(self, column):
+        low, high = self.ranges[column]
+        if high <= low:
+            high = low + 1
+        return np.linspace(low, high, FINE_BINS + 1)
+
+
+def _required(plot_ids):
+    histograms, boxes, counts = set(), set(), set()
+    for plot_id in plot_ids:
+        kind, _ = STREAMING_PLOTS[plot_id]
+        columns = registry.get(plot_id).columns
+        if kind == "histogram":
+            histograms.add(columns[0])
+        elif kind == "boxplot":
+            boxes.add((columns[0], columns[1]))
+        elif kind == "sunburst":
+            counts.add(tuple(columns))
+    return histograms, boxes, counts
+
+
+def _chunks(path, chunksize):
+    for chunk in pd.read_csv(path, dtype=Dataset.read_dtypes(), chunksize=chunksize):
+        yield features.build_features(Dataset.apply_schema(chunk))
+
+
+def _add_categories(aggregates, chunk, name):
+    # Open categories differ between chunks: keep every value seen so far
+    seen = aggregates.categories.setdefault(name, [])
+    seen.extend(value for value in chunk[name].cat.categories if value not in seen)
+
+
+def _fine_bins(values, edges):
+    positions = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(positions, 0, FINE_BINS - 1)
+
+
+def aggregate_csv(path=Dataset.file_path, plot_ids=None, chunksize=CHUNK_ROWS):
+    plot_ids = list(STREAMING_PLOTS) if plot_ids is None else plot_ids
+    histograms, boxes, counts = _required(plot_ids)
+    aggregates = Aggregates()
+
+    for chunk in _chunks(path, chunksize) if histograms else ():
+        for column in histograms:
+            values = chunk[column].dropna()
+            if values.empty:
+                continue
+            low, high = float(values.min()), float(values.max())
+            old = aggregates.ranges.get(column, (low, high))
+            aggregates.ranges[column] = (min(old[0], low), max(old[1], high))
+
+    for chunk in _chunks(path, chunksize):
+        aggregates.rows += len(chunk)
+
+        for column in histograms:
+            values = chunk[column].dropna().to_numpy()
+            counts_here = np.bincount(_fine_bins(values, aggregates.edges(column)), minlength=FINE_BINS)
+            aggregates.histograms[column] = aggregates.histograms.get(column, 0) + counts_here
+
+        for group, column in boxes:
+            _add_categories(aggregates, chunk, group)
+            sketches = aggregates.sketches.setdefault((group, column), {})
+            quantiles.group_sketches(chunk, group, column, sketches)
+
+        for columns in counts:
+            for name in columns:
+                _add_categories(aggregates, chunk, name)
+            sizes = chunk.groupby(list(columns), observed=True).size()
+            sizes.index = sizes.index.to_flat_index()
+            total = aggregates.group_counts.get(columns)
+            aggregates.group_counts[columns] = sizes if total is None else total.add(sizes, fill_value=0)
+
+        if aggregates.correlation is None:
+            aggregates.correlation = CorrelationStats(numeric_columns(chunk))
+        aggregates.correlation.update(chunk)
+
+    return aggregates
+
+
+def _note(ax, aggregates):
+    ax.text(0.99, 0.01, f"{aggregates.rows:,} rows (streamed)", transform=ax.transAxes,
+            ha="right", va="bottom", fontsize=8, color="dimgray")
+
+
+def draw_histogram(aggregates, spec, bins, color):
+    column = spec.columns[0]
+    edges = aggregates.edges(column)
+    counts = aggregates.histograms[column]
+    coarse = counts.reshape(bins, -1).sum(axis=1)
+    coarse_edges = edges[::FINE_BINS // bins]
+
+    fig = figures.acquire((8, 5))
+    ax = fig.add_subplot(111)
+    color = color or sns.color_palette()[0]
+    ax.bar(coarse_edges[:-1], coarse, width=np.diff(coarse_edges), align="edge",
+           color=color, alpha=0.75, edgecolor="white")
+    estimate = kde.kde_from_histogram(edges, counts)
+    if estimate is not None:
+        grid, density = estimate
+        ax.plot(grid, density * coarse.sum() * np.diff(coarse_edges)[0], color=color)
+    ax.set_title(spec.title)
+    ax.set_xlabel(column.replace("_", " "))
+    ax.set_ylabel("Count")
+    _note(ax, aggregates)
+    fig.tight_layout()
+    return fig
+
+
+def draw_boxplot(aggregates, spec, palette):
+    import visualization
+
+    group, column = spec.columns[0], spec.columns[1]
+    sketches = aggregates.sketches[(group, column)]
+    stats = [quantiles.box_stats(name, sketches[name]) for name in aggregates.categories[group]
+             if sketches[name].count]
+
+    fig = figures.acquire((8, 5))
+    ax = fig.add_subplot(111)
+    visualization.draw_box_stats(ax, stats, palette)
+    ax.set_title(spec.title)
+    ax.set_xlabel(group.replace("_", " "))
+    ax.set_ylabel(column.replace("_", " "))
+    _note(ax, aggregates)
+    fig.tight_layout()
+    return fig
+
+
+def draw_heatmap(aggregates, spec, cmap, lower=False):
+    corr = aggregates.correlation.correlation()
+    columns = ([name for name in corr.columns if name not in features.DERIVED_COLUMNS]
+               if spec.columns is registry.ALL_COLUMNS else list(spec.columns))
+    corr = corr.loc[columns, columns]
+    fig = figures.acquire((10, 8))
+    ax = fig.add_subplot(111)
+    mask = np.triu(np.ones_like(corr, dtype=bool)) if lower else None
+    sns.heatmap(corr, mask=mask, annot=True, fmt=".2f", cmap=cmap, linewidths=0.5, ax=ax)
+    ax.set_title(spec.title)
+    fig.tight_layout()
+    return fig
+
+
+def draw_sunburst(aggregates, spec):
+    import visualization
+
+    columns = tuple(spec.columns)
+    counts = aggregates.group_counts[columns]
+    grouped = pd.DataFrame(list(counts.index), columns=list(columns))
+    grouped["Count"] = counts.to_numpy().astype(np.int64)
+    for name in columns:
+        grouped[name] = pd.Categorical(grouped[name], categories=aggregates.categories[name])
+    grouped = grouped.sort_values(list(columns)).reset_index(drop=True)
+    if spec.id == "sunburst":
+        return visualization.draw_health_risk_sunburst(grouped)
+    return visualization.draw_risk_factors_sunburst(grouped)
+
+
+def render(aggregates, plot_id):
+    kind, options = STREAMING_PLOTS[plot_id]
+    spec = registry.get(plot_id)
+    if kind == "histogram":
+        return draw_histogram(aggregates, spec, **options)
+    if kind == "boxplot":
+        return draw_boxplot(aggregates, spec, **options)
+    if kind == "heatmap":
+        return draw_heatmap(aggregates, spec, **options)
+    return draw_sunburst(aggregates, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render charts from a CSV too large to load, one chunk at a time.")
+    parser.add_argument("plots", nargs="*", help="plot ids (default: every plot supported in streaming mode)")
+    parser.add_argument("--csv", default=Dataset.file_path)
+    parser.add_argument("-o", "--out", default="export")
+    parser.add_argument("-f", "--format", default="png", choices=("png", "svg", "pdf"))
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    plot_ids = [registry.get(name).id for name in args.plots] or list(STREAMING_PLOTS)
+    unsupported = [plot_id for plot_id in plot_ids if plot_id not in STREAMING_PLOTS]
+    if unsupported:
+        raise SystemExit(f"Not available in streaming mode: {', '.join(unsupported)}")
+
+    started = time.perf_counter()
+    aggregates = aggregate_csv(args.csv, plot_ids, args.chunksize)
+    print(f"Aggregated {aggregates.rows:,} rows in {time.perf_counter() - started:.2f}s")
+
+    os.makedirs(args.out, exist_ok=True)
+    for plot_id in plot_ids:
+        fig = render(aggregates, plot_id)
+        fig.savefig(os.path.join(args.out, f"{plot_id}.{args.format}"), format=args.format)
+        figures.release(fig)
+        print(f"ok    {plot_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,178 +1,459 @@
-import matplotlib.pyplot as plt
+import functools
+import matplotlib
 import seaborn as sns
-from Dataset import df
+import figures
+from features import get_features
+from correlation import correlation, correlation_linkage
+import registry
 import numpy as np
 from matplotlib.gridspec import GridSpec
 import matplotlib.patches as mpatches
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from matplotlib.colors import to_rgb
 import pandas as pd
+import kde
+import quantiles
+
+def _with_data(plot_function):
+    # Plots take the frame they draw as their first argument. When it is
+    # omitted, only the columns the registry lists for the plot are loaded,
+    # restricted to the rows matching `where` (see filters.py).
+    spec = registry.get(plot_function.__name__)
     
-def plot_alcohol_vs_heart_rate():
-    fig = plt.figure(figsize=(8,5))
-    sns.barplot(x="Alcohol_Consumption_per_Week", y="Heart_Rate", data=df, palette="Blues_d")
-    plt.title("Alcohol Consumption vs Heart Rate")
-    plt.xlabel("Alcohol Consumption (per Week)")
-    plt.ylabel("Heart Rate")
-    plt.tight_layout()
-    return fig
-
-def plot_alcohol_kde_by_gender():
-    fig = plt.figure(figsize=(10, 6))
-    sns.kdeplot(data=df, x="Alcohol_Consumption_per_Week", hue="Gender", fill=True, common_norm=False, alpha=0.5, palette="magma")
-    plt.title("Alcohol Consumption Distribution by Gender")
-    plt.xlabel("Alcohol Consumption per Week")
-    plt.ylabel("Density")
-    plt.tight_layout()
-    return fig
-
-def plot_advanced_correlation_heatmap():
-    fig = plt.figure(figsize=(12, 8))
-    corr = df.corr(numeric_only=True)
+    @functools.wraps(plot_function)
+    def wrapper(df=None, where=None, **kwargs):
+        if df is None:
+            df = get_features(spec.columns, where)
+        return plot_function(df, **kwargs)
+    return wrapper
+
+# Above this many rows scatter plots stop drawing one marker per row: plots
+# with a hue draw a stratified sample, plain ones a hexbin density image.
+SCATTER_POINT_LIMIT = 20_000
+MIN_POINTS_PER_GROUP = 500
+# Beeswarms get crowded long before scatter plots do
+SWARM_POINT_LIMIT = 2_000
+SWARM_MARKER_SIZE = 5
+# Wider correlation matrices are drawn as one image instead of annotated cells
+CLUSTERMAP_WIDE_FEATURES = 40
+CLUSTERMAP_MAX_TICKS = 60
+
+def _is_large(df, limit=SCATTER_POINT_LIMIT):
+    return len(df) > limit
+
+def stratified_sample(df, groups, limit=SCATTER_POINT_LIMIT, seed=0):
+    if len(df) <= limit:
+        return df
+    rng = np.random.default_rng(seed)
+    fraction = limit / len(df)
+    picks = []
+    for positions in df.groupby(groups, observed=True).indices.values():
+        size = min(len(positions), max(MIN_POINTS_PER_GROUP, int(round(len(positions) * fraction))))
+        picks.append(rng.choice(positions, size=size, replace=False))
+    return df.iloc[np.sort(np.concatenate(picks))]
+
+def _annotate_points(target, text):
+    style = dict(ha="right", va="bottom", fontsize=8, color="dimgray")
+    if hasattr(target, "transAxes"):
+        target.text(0.99, 0.01, text, transform=target.transAxes, **style)
+    else:
+        target.text(0.99, 0.01, text, **style)
+
+def _new_figure(fig, figsize):
+    # Plots draw on the figure they are handed (blanked and resized) or on
+    # one from figures.pool, never through pyplot
+    return figures.acquire(figsize) if fig is None else figures.prepare(fig, figsize)
+
+def _figure(fig, figsize, ax=None, **subplot_kw):
+    # Single-axes plots can also draw into an Axes of a larger figure, which
+    # is otherwise left alone
+    if ax is not None:
+        return ax.figure, ax
+    fig = _new_figure(fig, figsize)
+    return fig, fig.add_subplot(111, **subplot_kw)
+
+def _facet_axes(fig, levels, height=5, aspect=1.2):
+    # One column of axes per level with shared scales, as sns.FacetGrid(col=...)
+    fig = _new_figure(fig, (height * aspect * len(levels), height))
+    return fig, fig.subplots(1, len(levels), sharex=True, sharey=True, squeeze=False)[0]
+
+def _histplot_kde(series, bins, ax, color=None):
+    # histplot(kde=True), with the curve from the binned KDE on large data
+    if len(series) < kde.BINNED_KDE_MIN_POINTS:
+        return sns.histplot(series, bins=bins, kde=True, color=color, ax=ax)
+    ax = sns.histplot(series, bins=bins, color=color, ax=ax)
+    estimate = kde.kde_1d(series.to_numpy(), cut=0)
+    if estimate is not None:
+        grid, density = estimate
+        hist_area = sum(bar.get_height() * bar.get_width() for bar in ax.patches)
+        ax.plot(grid, density * hist_area, color=to_rgb(ax.patches[0].get_facecolor()))
+    return ax
+
+def draw_box_stats(ax, stats, palette=None):
+    # Precomputed box statistics (quantiles.box_stats) drawn like sns.boxplot
+    artists = ax.bxp(stats, patch_artist=True, widths=0.8,
+                     medianprops={"color": "0.25"}, whiskerprops={"color": "0.25"},
+                     capprops={"color": "0.25"}, boxprops={"edgecolor": "0.25"},
+                     flierprops={"marker": "d", "markerfacecolor": "0.25", "markeredgecolor": "0.25", "markersize": 4})
+    for box, color in zip(artists["boxes"], sns.color_palette(palette, len(stats))):
+        box.set_facecolor(color)
+    return ax
+
+def _boxplot(x, y, df, ax, palette=None):
+    # sns.boxplot, with exact per-group statistics drawn by bxp on large data
+    if len(df) < quantiles.BOXPLOT_STATS_MIN_ROWS:
+        return sns.boxplot(x=x, y=y, data=df, palette=palette, ax=ax)
+    draw_box_stats(ax, quantiles.group_box_stats(df, x, y), palette)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return ax
+
+def _levels(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return list(series.cat.categories)
+    return sorted(series.dropna().unique())
+
+def _beeswarm_offsets(values, row_height, point_width, half_width):
+    # Binned beeswarm: points within one marker height of each other share a
+    # row and are laid side by side, alternating right and left of the centre.
+    # A row too full for half_width is squeezed to fit instead of overflowing.
+    rows = np.floor(values / row_height).astype(np.int64)
+    order = np.lexsort((values, rows))
+    rows = rows[order]
+    first = np.searchsorted(rows, rows, side="left")
+    row_size = np.searchsorted(rows, rows, side="right") - first
+    rank = np.arange(len(rows)) - first
+    slot = (rank + 1) // 2 * np.where(rank % 2, 1, -1)
+    spacing = np.minimum(point_width, half_width / np.maximum(row_size // 2, 1))
+    offsets = np.empty(len(values))
+    offsets[order] = slot * spacing
+    return offsets
+
+def _beeswarm(ax, df, x, y, hue, size=SWARM_MARKER_SIZE, **scatter_kws):
+    # sns.swarmplot(dodge=True) laid out in O(n log n). Above
+    # SWARM_POINT_LIMIT points a stratified sample keeps every x/hue cell.
+    sample = stratified_sample(df, [x, hue], SWARM_POINT_LIMIT)
+    if len(sample) < len(df):
+        _annotate_points(ax, _sample_note(sample, df))
+    x_levels, hue_levels = _levels(df[x]), _levels(df[hue])
+    dodge = 0.8 / len(hue_levels)
+
+    diameter = size * ax.figure.dpi / 72
+    extent = ax.get_window_extent()
+    row_height = diameter / extent.height * np.diff(ax.get_ylim())[0]
+    point_width = diameter / extent.width * np.diff(ax.get_xlim())[0]
+
+    values = sample[y].to_numpy(dtype=np.float64)
+    centers = np.full(len(sample), np.nan)
+    x_codes = pd.Categorical(sample[x], categories=x_levels).codes
+    hue_codes = pd.Categorical(sample[hue], categories=hue_levels).codes
+    for i in range(len(x_levels)):
+        for j in range(len(hue_levels)):
+            cell = (x_codes == i) & (hue_codes == j) & np.isfinite(values)
+            if cell.any():
+                centers[cell] = (i - 0.4 + dodge * (j + 0.5)
+                                 + _beeswarm_offsets(values[cell], row_height, point_width, dodge / 2))
+    ax.scatter(centers, values, s=size ** 2, linewidths=0, **scatter_kws)
+    return ax
+
+def _dendrogram_segments(tree):
+    # scipy dendrogram coordinates -> (x, height) polylines, leaf i at x = i + 0.5
+    return [np.column_stack([np.asarray(xs) / 10, ys]) for xs, ys in zip(tree["icoord"], tree["dcoord"])]
+
+def _clustermap(corr, link, title, fig=None):
+    # sns.clustermap on a given figure. Each dendrogram is one LineCollection;
+    # up to CLUSTERMAP_WIDE_FEATURES the matrix is an annotated heatmap, wider
+    # ones (hundreds of features) are a single image with at most
+    # CLUSTERMAP_MAX_TICKS labels per axis.
+    from scipy.cluster import hierarchy
+
+    tree = hierarchy.dendrogram(link, no_plot=True)
+    order = tree["leaves"]
+    matrix = corr.to_numpy()[np.ix_(order, order)]
+    labels = corr.columns[order]
+    n = len(order)
+    height = max(max(ys) for ys in tree["dcoord"]) * 1.05 or 1
+    wide = n > CLUSTERMAP_WIDE_FEATURES
+
+    fig = _new_figure(fig, (12, 12) if wide else (10, 10))
+    gs = GridSpec(2, 2, figure=fig, width_ratios=[0.15, 1], height_ratios=[0.15, 1], wspace=0.02, hspace=0.02)
+    ax_top = fig.add_subplot(gs[0, 1])
+    ax_left = fig.add_subplot(gs[1, 0])
+    ax_heatmap = fig.add_subplot(gs[1, 1])
+    segments = _dendrogram_segments(tree)
+    ax_top.add_collection(LineCollection(segments, colors="0.2", linewidths=0.5))
+    ax_top.set_xlim(0, n)
+    ax_top.set_ylim(0, height)
+    ax_left.add_collection(LineCollection([segment[:, ::-1] for segment in segments], colors="0.2", linewidths=0.5))
+    ax_left.set_xlim(height, 0)
+    ax_left.set_ylim(n, 0)
+    ax_top.set_axis_off()
+    ax_left.set_axis_off()
+    # Colorbar in the top-left corner, as seaborn places it
+    corner = fig.add_subplot(gs[0, 0])
+    corner.set_axis_off()
+    colorbar_ax = corner.inset_axes([0.1, 0.1, 0.15, 0.8])
+
+    if wide:
+        image = ax_heatmap.imshow(matrix, cmap="coolwarm", aspect="auto", interpolation="nearest",
+                                  extent=(0, n, n, 0))
+        step = int(np.ceil(n / CLUSTERMAP_MAX_TICKS))
+        ticks = np.arange(0, n, step) + 0.5
+        ax_heatmap.set_xticks(ticks, labels[::step], rotation=90, fontsize=6)
+        ax_heatmap.set_yticks(ticks, labels[::step], fontsize=6)
+        fig.colorbar(image, cax=colorbar_ax)
+    else:
+        sns.heatmap(pd.DataFrame(matrix, index=labels, columns=labels), cmap="coolwarm", annot=True,
+                    ax=ax_heatmap, cbar_ax=colorbar_ax)
+        ax_heatmap.tick_params(axis="y", rotation=0)
+    ax_heatmap.yaxis.tick_right()
+    fig.suptitle(title)
+    return fig
+
+def _sample_note(sample, df):
+    return f"Showing {len(sample):,} of {len(df):,} points (stratified sample)"
+
+def _scatter_sample(target, df, groups):
+    sample = stratified_sample(df, groups)
+    if len(sample) < len(df):
+        _annotate_points(target, _sample_note(sample, df))
+    return sample
+
+@_with_data
+def plot_alcohol_vs_heart_rate(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    sns.barplot(x="Alcohol_Consumption_per_Week", y="Heart_Rate", data=df, palette="Blues_d", ax=ax)
+    ax.set_title("Alcohol Consumption vs Heart Rate")
+    ax.set_xlabel("Alcohol Consumption (per Week)")
+    ax.set_ylabel("Heart Rate")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_alcohol_kde_by_gender(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 6), ax)
+    if len(df) < kde.BINNED_KDE_MIN_POINTS:
+        sns.kdeplot(data=df, x="Alcohol_Consumption_per_Week", hue="Gender", fill=True, common_norm=False, alpha=0.5, palette="magma", ax=ax)
+    else:
+        groups = df.groupby("Gender", observed=True)["Alcohol_Consumption_per_Week"]
+        for (gender, values), color in zip(groups, sns.color_palette("magma", groups.ngroups)):
+            estimate = kde.kde_1d(values.to_numpy())
+            if estimate is None:
+                continue
+            grid, density = estimate
+            ax.fill_between(grid, density, color=color, alpha=0.5, label=gender)
+            ax.plot(grid, density, color=color)
+        ax.set_ylim(bottom=0)
+        ax.legend(title="Gender")
+    ax.set_title("Alcohol Consumption Distribution by Gender")
+    ax.set_xlabel("Alcohol Consumption per Week")
+    ax.set_ylabel("Density")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_advanced_correlation_heatmap(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (12, 8), ax)
+    corr = correlation(df)
     mask = np.triu(np.ones_like(corr, dtype=bool))
-    sns.heatmap(corr, mask=mask, annot=True, fmt=".2f", cmap="YlGnBu", linewidths=.5)
-    plt.title("Advanced Correlation Heatmap")
-    plt.tight_layout()
-    return fig
-
-def plot_bmi_vs_age():
-    fig = plt.figure(figsize=(8,5))
-    sns.regplot(x="Age", y="BMI", data=df, scatter_kws={'s': 100, 'alpha': 0.5}, line_kws={'color': 'red'})
-    plt.title("BMI vs Age with Regression Line")
-    plt.xlabel("Age")
-    plt.ylabel("BMI")
-    plt.tight_layout()
-    return fig
-
-def plot_facetgrid_steps_vs_bmi():
-    g = sns.FacetGrid(df, col="Gender", height=5, aspect=1.2)
-    g.map(sns.scatterplot, "Daily_Steps", "BMI", alpha=0.7)
-    g.set_axis_labels("Daily Steps", "BMI")
-    g.set_titles("{col_name} Gender")
-    g.fig.suptitle("Daily Steps vs BMI by Gender", y=1.05)
-    plt.tight_layout()
-    return g.fig
-
-def plot_age_distribution():
-    fig = plt.figure(figsize=(8,5))
-    sns.histplot(df['Age'], bins=20, kde=True)
-    plt.title("Age Distribution")
-    plt.xlabel("Age")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    return fig
-
-def plot_bmi_vs_smoker_by_gender():
-    fig = plt.figure(figsize=(10,6))
-    sns.violinplot(x="Smoker", y="BMI", hue="Gender", data=df, split=True, inner="quartile", palette="Pastel1")
-    sns.swarmplot(x="Smoker", y="BMI", hue="Gender", data=df, dodge=True, alpha=0.5, color=".2")
-    plt.title("BMI Distribution by Smoker Status and Gender")
-    plt.xlabel("Smoker")
-    plt.ylabel("BMI")
-    plt.legend(title="Gender", loc='upper right')
-    plt.tight_layout()
-    return fig
-
-def plot_bmi_distribution():
-    fig = plt.figure(figsize=(8,5))
-    sns.histplot(df['BMI'], bins=20, kde=True, color="green")
-    plt.title("BMI Distribution")
-    plt.xlabel("BMI")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    return fig
-
-def plot_exercise_by_smoker():
-    fig = plt.figure(figsize=(8,5))
-    sns.boxplot(x="Smoker", y="Exercise_Hours_per_Week", data=df, palette="Set3")
-    plt.title("Exercise Hours per Week by Smoker Status")
-    plt.tight_layout()
-    return fig
-
-def plot_sleep_distribution():
-    fig = plt.figure(figsize=(8,5))
-    sns.histplot(df['Hours_of_Sleep'], bins=15, kde=True, color="orange")
-    plt.title("Sleep Hours Distribution")
-    plt.xlabel("Hours Slept")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    return fig
-
-def plot_heatmap():
-    fig = plt.figure(figsize=(10,7))
-    sns.heatmap(df.corr(numeric_only=True), annot=True, cmap="coolwarm", linewidths=0.5)
-    plt.title("Correlation Heatmap")
-    plt.tight_layout()
-    return fig
-
-def plot_bmi_by_gender():
-    fig = plt.figure(figsize=(8,5))
-    sns.boxplot(x="Gender", y="BMI", data=df, palette="Set2")
-    plt.title("BMI by Gender")
-    plt.tight_layout()
-    return fig
-
-def plot_steps_vs_bmi():
-    fig = plt.figure(figsize=(8,5))
-    sns.scatterplot(x="Daily_Steps", y="BMI", data=df, hue="Gender")
-    plt.title("Daily Steps vs BMI")
-    plt.tight_layout()
-    return fig
-
-def plot_pairplot():
-    g = sns.pairplot(df, hue="Gender", palette="Set2", diag_kind="kde")
-    g.figure.suptitle("Pairplot of Numeric Features", y=1.03)
-    g.figure.tight_layout()  
-    return g.figure
-
-def plot_clustermap():
-    numeric_df = df.select_dtypes(include=["float64", "int64"])
-    g = sns.clustermap(numeric_df.corr(), cmap="coolwarm", annot=True)
-    plt.title("Clustermap of Feature Correlations")
-    return g.fig
-
-def plot_radar_chart(index=0):
-    fig = plt.figure(figsize=(6, 6))
+    sns.heatmap(corr, mask=mask, annot=True, fmt=".2f", cmap="YlGnBu", linewidths=.5, ax=ax)
+    ax.set_title("Advanced Correlation Heatmap")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_bmi_vs_age(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    if _is_large(df):
+        image = ax.hexbin(df["Age"], df["BMI"], gridsize=60, mincnt=1, cmap="Blues", bins="log")
+        fig.colorbar(image, ax=ax, label="Count")
+        sns.regplot(x="Age", y="BMI", data=df, scatter=False, ci=None, line_kws={'color': 'red'}, ax=ax)
+        _annotate_points(ax, f"{len(df):,} points (hexbin density)")
+    else:
+        sns.regplot(x="Age", y="BMI", data=df, scatter_kws={'s': 100, 'alpha': 0.5}, line_kws={'color': 'red'}, ax=ax)
+    ax.set_title("BMI vs Age with Regression Line")
+    ax.set_xlabel("Age")
+    ax.set_ylabel("BMI")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_facetgrid_steps_vs_bmi(df, fig=None):
+    sample = stratified_sample(df, "Gender")
+    levels = _levels(sample["Gender"])
+    fig, axes = _facet_axes(fig, levels)
+    for ax, level in zip(axes, levels):
+        sns.scatterplot(x="Daily_Steps", y="BMI", data=sample[sample["Gender"] == level], alpha=0.7, ax=ax)
+        ax.set_title(f"{level} Gender")
+        ax.set_xlabel("Daily Steps")
+        ax.set_ylabel("BMI" if ax is axes[0] else "")
+    fig.suptitle("Daily Steps vs BMI by Gender", y=1.05)
+    fig.tight_layout()
+    if len(sample) < len(df):
+        _annotate_points(fig, _sample_note(sample, df))
+    return fig
+
+@_with_data
+def plot_age_distribution(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _histplot_kde(df['Age'], bins=20, ax=ax)
+    ax.set_title("Age Distribution")
+    ax.set_xlabel("Age")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_bmi_vs_smoker_by_gender(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 6), ax)
+    sns.violinplot(x="Smoker", y="BMI", hue="Gender", data=df, split=True, inner="quartile", palette="Pastel1", ax=ax)
+    _beeswarm(ax, df, "Smoker", "BMI", "Gender", alpha=0.5, color=".2")
+    ax.set_title("BMI Distribution by Smoker Status and Gender")
+    ax.set_xlabel("Smoker")
+    ax.set_ylabel("BMI")
+    ax.legend(title="Gender", loc='upper right')
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_bmi_distribution(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _histplot_kde(df['BMI'], bins=20, ax=ax, color="green")
+    ax.set_title("BMI Distribution")
+    ax.set_xlabel("BMI")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_exercise_by_smoker(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _boxplot("Smoker", "Exercise_Hours_per_Week", df, ax, palette="Set3")
+    ax.set_title("Exercise Hours per Week by Smoker Status")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_sleep_distribution(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _histplot_kde(df['Hours_of_Sleep'], bins=15, ax=ax, color="orange")
+    ax.set_title("Sleep Hours Distribution")
+    ax.set_xlabel("Hours Slept")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_heatmap(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 7), ax)
+    sns.heatmap(correlation(df), annot=True, cmap="coolwarm", linewidths=0.5, ax=ax)
+    ax.set_title("Correlation Heatmap")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_bmi_by_gender(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _boxplot("Gender", "BMI", df, ax, palette="Set2")
+    ax.set_title("BMI by Gender")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_steps_vs_bmi(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    sample = _scatter_sample(ax, df, "Gender")
+    sns.scatterplot(x="Daily_Steps", y="BMI", data=sample, hue="Gender", ax=ax)
+    ax.set_title("Daily Steps vs BMI")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_pairplot(df, fig=None):
+    # sns.pairplot(hue="Gender", diag_kind="kde") laid out on `fig`
+    columns = [name for name in df.columns if name != "Gender" and pd.api.types.is_numeric_dtype(df[name])]
+    levels = _levels(df["Gender"])
+    palette = dict(zip(levels, sns.color_palette("Set2", len(levels))))
+    n = len(columns)
+    fig = _new_figure(fig, (2.5 * n, 2.5 * n))
+    axes = fig.subplots(n, n, sharex="col", sharey="row", squeeze=False)
+    for i, y in enumerate(columns):
+        for j, x in enumerate(columns):
+            ax = axes[i, j]
+            if i == j:
+                # Densities get their own y scale, hidden like seaborn's diagonal
+                diagonal = ax.twinx()
+                sns.kdeplot(data=df, x=x, hue="Gender", hue_order=levels, palette=palette, fill=True,
+                            warn_singular=False, legend=False, ax=diagonal)
+                diagonal.set_axis_off()
+            else:
+                sns.scatterplot(data=df, x=x, y=y, hue="Gender", hue_order=levels, palette=palette,
+                                legend=False, ax=ax)
+            ax.set_xlabel(x if i == n - 1 else "")
+            ax.set_ylabel(y if j == 0 else "")
+    handles = [Line2D([], [], marker="o", linestyle="", color=palette[level], label=level) for level in levels]
+    fig.legend(handles=handles, title="Gender", loc="center right", frameon=False)
+    fig.suptitle("Pairplot of Numeric Features", y=1.03)
+    fig.tight_layout(rect=(0, 0, 0.95, 1))
+    return fig
+
+@_with_data
+def plot_clustermap(df, fig=None):
+    corr, link = correlation_linkage(df)
+    return _clustermap(corr, link, "Clustermap of Feature Correlations", fig)
+
+@_with_data
+def plot_radar_chart(df, index=0, fig=None, ax=None):
+    fig, ax = _figure(fig, (6, 6), ax, polar=True)
     categories = ['BMI', 'Daily_Steps', 'Hours_of_Sleep', 'Heart_Rate', 'Exercise_Hours_per_Week', 'Alcohol_Consumption_per_Week']
     values = df.loc[index, categories].values.flatten().tolist()
     values += values[:1]  
     angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
     angles += angles[:1]
-    ax = fig.add_subplot(111, polar=True)
     ax.plot(angles, values, color='r', linewidth=2)
     ax.fill(angles, values, color='r', alpha=0.25)
     ax.set_yticklabels([])
     ax.set_xticks(angles[:-1])
     ax.set_xticklabels(categories)
     ax.set_title(f"Radar Chart: Profile for Individual {df.loc[index, 'ID']}")
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.gridspec import GridSpec
-
-def plot_health_dashboard():
-    fig = plt.figure(figsize=(16, 6))  
+@_with_data
+def plot_health_dashboard(df, fig=None):
+    fig = _new_figure(fig, (16, 6))
     gs = GridSpec(1, 3, figure=fig, wspace=0.4) 
     ax1 = fig.add_subplot(gs[0, 0])
-    sns.scatterplot(x='Age', y='BMI', hue='Gender', data=df, ax=ax1)
+    sample = _scatter_sample(ax1, df, 'Gender')
+    sns.scatterplot(x='Age', y='BMI', hue='Gender', data=sample, ax=ax1)
     ax1.set_title('Age vs BMI', fontsize=13)
     ax2 = fig.add_subplot(gs[0, 1])
-    sns.kdeplot(data=df, x='Hours_of_Sleep', y='Exercise_Hours_per_Week',
-                cmap='Purples', fill=True, ax=ax2)
+    if len(df) < kde.BINNED_KDE_2D_MIN_POINTS:
+        sns.kdeplot(data=df, x='Hours_of_Sleep', y='Exercise_Hours_per_Week',
+                    cmap='Purples', fill=True, ax=ax2)
+    else:
+        estimate = kde.kde_2d(df['Hours_of_Sleep'].to_numpy(), df['Exercise_Hours_per_Week'].to_numpy())
+        if estimate is not None:
+            grid_x, grid_y, density = estimate
+            ax2.contourf(grid_x, grid_y, density, levels=kde.density_levels(density), cmap='Purples', extend='max')
+        ax2.set_xlabel('Hours_of_Sleep')
+        ax2.set_ylabel('Exercise_Hours_per_Week')
     ax2.set_title('Sleep vs Exercise Hours', fontsize=13)
     ax3 = fig.add_subplot(gs[0, 2])
-    ax3 = fig.add_subplot(gs[0, 2])
-    sns.boxplot(x='Gender', y='Daily_Steps', data=df, ax=ax3)
+    _boxplot('Gender', 'Daily_Steps', df, ax3)
     ax3.set_title('Daily Steps by Gender', fontsize=13)
-    plt.tight_layout()
+    fig.tight_layout()
     fig.suptitle('Simplified Health Dashboard', fontsize=16, weight='bold', y=1.02)
     return fig
 
-def plot_sunburst():
-    df['Health_Risk'] = np.where((df['BMI'] > 30) | (df['Heart_Rate'] > 90), 
-                               'High', 'Low')
-    grouped = df.groupby(['Gender', 'Smoker', 'Health_Risk']).size().reset_index(name='Count')
-    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(aspect="equal"))    
+@_with_data
+def plot_sunburst(df, fig=None, ax=None):
+    grouped = df.groupby(['Gender', 'Smoker', 'Health_Risk'], observed=True).size().reset_index(name='Count')
+    return draw_health_risk_sunburst(grouped, fig, ax)
+
+def draw_health_risk_sunburst(grouped, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 10), ax, aspect="equal")    
     colors = {
         ('Male', 'No', 'Low'): 'lightblue',
         ('Male', 'No', 'High'): 'blue',
@@ -183,17 +464,17 @@ def plot_sunburst():
         ('Female', 'Yes', 'Low'): 'lightyellow',
         ('Female', 'Yes', 'High'): 'yellow'
     }    
-    outer_vals = grouped.groupby('Gender')['Count'].sum()
+    outer_vals = grouped.groupby('Gender', observed=True)['Count'].sum()
     wedges_outer, _ = ax.pie(outer_vals, radius=1.3, 
                              colors=['lightblue', 'pink'], 
                              wedgeprops=dict(width=0.3, edgecolor='w'))
-    mid_vals = grouped.groupby(['Gender', 'Smoker'])['Count'].sum()
+    mid_vals = grouped.groupby(['Gender', 'Smoker'], observed=True)['Count'].sum()
     wedges_mid, _ = ax.pie(mid_vals, radius=1.0, 
                            colors=['lightblue', 'lightgreen', 'pink', 'lightyellow'], 
                            wedgeprops=dict(width=0.3, edgecolor='w'))
     inner_vals = grouped['Count']
     wedges_inner, _ = ax.pie(inner_vals, radius=0.7, 
-                             colors=[colors[tuple(x)] for x in grouped[['Gender', 'Smoker', 'Health_Risk']].values], 
+                             colors=[colors.get(tuple(x), 'lightgray') for x in grouped[['Gender', 'Smoker', 'Health_Risk']].values], 
                              wedgeprops=dict(width=0.3, edgecolor='w'))    
     ax.set_title("Health Risk Sunburst Chart\n(Gender → Smoking Status → Risk Level)", pad=20)    
     legend_elements = [
@@ -205,122 +486,139 @@ def plot_sunburst():
         mpatches.Patch(facecolor='yellow', label='Female Smoker High Risk')
     ]
     ax.legend(handles=legend_elements, bbox_to_anchor=(1, 0.5), loc='center left')
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
-def plot_steps_distribution():
-    fig = plt.figure(figsize=(8,5))
-    sns.histplot(df['Daily_Steps'], bins=20, kde=True, color="purple")
-    plt.title("Daily Steps Distribution")
-    plt.xlabel("Daily Steps")
-    plt.ylabel("Count")
-    plt.tight_layout()
+@_with_data
+def plot_steps_distribution(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _histplot_kde(df['Daily_Steps'], bins=20, ax=ax, color="purple")
+    ax.set_title("Daily Steps Distribution")
+    ax.set_xlabel("Daily Steps")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
     return fig
 
-def plot_heart_rate_distribution():
-    fig = plt.figure(figsize=(8,5))
-    sns.histplot(df['Heart_Rate'], bins=15, kde=True, color="crimson")
-    plt.title("Heart Rate Distribution")
-    plt.xlabel("Heart Rate (bpm)")
-    plt.ylabel("Count")
-    plt.tight_layout()
+@_with_data
+def plot_heart_rate_distribution(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _histplot_kde(df['Heart_Rate'], bins=15, ax=ax, color="crimson")
+    ax.set_title("Heart Rate Distribution")
+    ax.set_xlabel("Heart Rate (bpm)")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
     return fig
 
-def plot_sleep_by_age_group():
-    df['Age_Group'] = pd.cut(df['Age'], bins=[0, 30, 50, 70, 100], labels=['<30', '30-50', '50-70', '70+'])
-    
-    fig = plt.figure(figsize=(10,6))
-    sns.boxplot(x="Age_Group", y="Hours_of_Sleep", data=df, palette="viridis")
-    plt.title("Sleep Hours by Age Group")
-    plt.xlabel("Age Group")
-    plt.ylabel("Hours of Sleep")
-    plt.tight_layout()
-    return fig
-
-def plot_heart_rate_by_diabetic():
-    fig = plt.figure(figsize=(8,5))
-    sns.boxplot(x="Diabetic", y="Heart_Rate", data=df, palette="RdYlBu")
-    plt.title("Heart Rate by Diabetic Status")
-    plt.xlabel("Diabetic Status")
-    plt.ylabel("Heart Rate (bpm)")
-    plt.tight_layout()
-    return fig
-
-def plot_health_metrics_heatmap():
-    health_metrics = ['BMI', 'Heart_Rate', 'Blood_Pressure', 'Hours_of_Sleep', 'Exercise_Hours_per_Week']    
-    df['Systolic'] = df['Blood_Pressure'].apply(lambda x: int(x.split('/')[0]))
-    df['Diastolic'] = df['Blood_Pressure'].apply(lambda x: int(x.split('/')[1]))
-    metrics_df = df[['BMI', 'Heart_Rate', 'Systolic', 'Diastolic', 'Hours_of_Sleep', 'Exercise_Hours_per_Week']]
-    fig = plt.figure(figsize=(10,8))
-    sns.heatmap(metrics_df.corr(), annot=True, cmap="YlGnBu", linewidths=0.5)
-    plt.title("Health Metrics Correlation Heatmap")
-    plt.tight_layout()
-    return fig
-
-def plot_lifestyle_vital_correlation():
+@_with_data
+def plot_sleep_by_age_group(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 6), ax)
+    _boxplot("Age_Group", "Hours_of_Sleep", df, ax, palette="viridis")
+    ax.set_title("Sleep Hours by Age Group")
+    ax.set_xlabel("Age Group")
+    ax.set_ylabel("Hours of Sleep")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_heart_rate_by_diabetic(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (8, 5), ax)
+    _boxplot("Diabetic", "Heart_Rate", df, ax, palette="RdYlBu")
+    ax.set_title("Heart Rate by Diabetic Status")
+    ax.set_xlabel("Diabetic Status")
+    ax.set_ylabel("Heart Rate (bpm)")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_health_metrics_heatmap(df, fig=None, ax=None):
+    metrics = ['BMI', 'Heart_Rate', 'Systolic', 'Diastolic', 'Hours_of_Sleep', 'Exercise_Hours_per_Week']
+    fig, ax = _figure(fig, (10, 8), ax)
+    sns.heatmap(correlation(df, metrics), annot=True, cmap="YlGnBu", linewidths=0.5, ax=ax)
+    ax.set_title("Health Metrics Correlation Heatmap")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_lifestyle_vital_correlation(df, fig=None, ax=None):
     lifestyle = ['Daily_Steps', 'Calories_Intake', 'Exercise_Hours_per_Week', 'Alcohol_Consumption_per_Week']    
-    df['Systolic'] = df['Blood_Pressure'].apply(lambda x: int(x.split('/')[0]))
-    df['Diastolic'] = df['Blood_Pressure'].apply(lambda x: int(x.split('/')[1]))    
     vitals = ['Heart_Rate', 'Systolic', 'Diastolic', 'BMI']
-    fig = plt.figure(figsize=(10,8))
-    lifestyle_vital_df = df[lifestyle + vitals]
-    sns.heatmap(lifestyle_vital_df.corr(), annot=True, cmap="coolwarm", linewidths=0.5)
-    plt.title("Lifestyle vs Vital Signs Correlation")
-    plt.tight_layout()
+    fig, ax = _figure(fig, (10, 8), ax)
+    sns.heatmap(correlation(df, lifestyle + vitals), annot=True, cmap="coolwarm", linewidths=0.5, ax=ax)
+    ax.set_title("Lifestyle vs Vital Signs Correlation")
+    fig.tight_layout()
     return fig
 
-def plot_age_health_correlation():
+@_with_data
+def plot_age_health_correlation(df, fig=None, ax=None):
     health_indicators = ['Age', 'BMI', 'Heart_Rate', 'Hours_of_Sleep', 'Exercise_Hours_per_Week']
-    fig = plt.figure(figsize=(12,8))
-    corr_matrix = df[health_indicators].corr()
+    fig, ax = _figure(fig, (12, 8), ax)
+    corr_matrix = correlation(df, health_indicators)
     mask = np.zeros_like(corr_matrix)
     mask[np.triu_indices_from(mask)] = True
-    sns.heatmap(corr_matrix, mask=mask, annot=True, cmap="YlOrRd", linewidths=0.5)
-    plt.title("Age vs Health Indicators Correlation")
-    plt.tight_layout()
+    sns.heatmap(corr_matrix, mask=mask, annot=True, cmap="YlOrRd", linewidths=0.5, ax=ax)
+    ax.set_title("Age vs Health Indicators Correlation")
+    fig.tight_layout()
     return fig
 
-def plot_exercise_impact_correlation():
+@_with_data
+def plot_exercise_impact_correlation(df, fig=None, ax=None):
     impact_vars = ['Exercise_Hours_per_Week', 'BMI', 'Heart_Rate', 'Hours_of_Sleep', 'Daily_Steps']
-    fig = plt.figure(figsize=(10,6))
-    impact_df = df[impact_vars]
-    sns.heatmap(impact_df.corr(), annot=True, cmap="PuBu", linewidths=0.5)
-    plt.title("Exercise Impact on Health Metrics")
-    plt.tight_layout()
+    fig, ax = _figure(fig, (10, 6), ax)
+    sns.heatmap(correlation(df, impact_vars), annot=True, cmap="PuBu", linewidths=0.5, ax=ax)
+    ax.set_title("Exercise Impact on Health Metrics")
+    fig.tight_layout()
     return fig
 
-def plot_sleep_vs_exercise():
-    fig = plt.figure(figsize=(10,6))
+@_with_data
+def plot_sleep_vs_exercise(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 6), ax)
+    sample = _scatter_sample(ax, df, "Gender")
     sns.scatterplot(x="Hours_of_Sleep", y="Exercise_Hours_per_Week", hue="Gender", size="Age", 
-                    sizes=(20, 200), palette="viridis", data=df)
-    plt.title("Sleep Hours vs Exercise Hours")
-    plt.xlabel("Hours of Sleep")
-    plt.ylabel("Exercise Hours per Week")
-    plt.tight_layout()
+                    sizes=(20, 200), palette="viridis", data=sample, ax=ax)
+    ax.set_title("Sleep Hours vs Exercise Hours")
+    ax.set_xlabel("Hours of Sleep")
+    ax.set_ylabel("Exercise Hours per Week")
+    fig.tight_layout()
     return fig
 
-def plot_calories_vs_weight():
-    fig = plt.figure(figsize=(10,6))
+@_with_data
+def plot_calories_vs_weight(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (10, 6), ax)
+    sample = _scatter_sample(ax, df, ["Gender", "Smoker"])
     sns.scatterplot(x="Calories_Intake", y="Weight_kg", hue="Gender", style="Smoker", 
-                   size="Age", sizes=(30, 200), data=df)
-    plt.title("Calorie Intake vs Weight")
-    plt.xlabel("Daily Calorie Intake")
-    plt.ylabel("Weight (kg)")
-    plt.tight_layout()
-    return fig
-
-def plot_facetgrid_metrics_by_gender():
-    g = sns.FacetGrid(df, col="Gender", height=5, aspect=1.2)
-    g.map_dataframe(sns.scatterplot, x="BMI", y="Heart_Rate", hue="Smoker", size="Age", sizes=(20, 200), alpha=0.7)
-    g.add_legend()
-    g.set_axis_labels("BMI", "Heart Rate")
-    g.set_titles("{col_name} Gender")
-    g.fig.suptitle("Health Metrics by Gender", y=1.05)
-    plt.tight_layout()
-    return g.fig
-
-def plot_health_radar_chart():
-    fig = plt.figure(figsize=(12, 8))    
+                   size="Age", sizes=(30, 200), data=sample, ax=ax)
+    ax.set_title("Calorie Intake vs Weight")
+    ax.set_xlabel("Daily Calorie Intake")
+    ax.set_ylabel("Weight (kg)")
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_facetgrid_metrics_by_gender(df, fig=None):
+    sample = stratified_sample(df, ["Gender", "Smoker"])
+    levels = _levels(sample["Gender"])
+    fig, axes = _facet_axes(fig, levels)
+    # Same colours and marker sizes in every facet; one legend, beside the last
+    hue_order = _levels(sample["Smoker"])
+    size_norm = (sample["Age"].min(), sample["Age"].max())
+    for ax, level in zip(axes, levels):
+        sns.scatterplot(x="BMI", y="Heart_Rate", hue="Smoker", size="Age", sizes=(20, 200), alpha=0.7,
+                        hue_order=hue_order, size_norm=size_norm, data=sample[sample["Gender"] == level],
+                        legend="auto" if ax is axes[-1] else False, ax=ax)
+        ax.set_title(f"{level} Gender")
+        ax.set_xlabel("BMI")
+        ax.set_ylabel("Heart Rate" if ax is axes[0] else "")
+    if axes[-1].get_legend() is not None:
+        sns.move_legend(axes[-1], "center left", bbox_to_anchor=(1.02, 0.5), frameon=False)
+    fig.suptitle("Health Metrics by Gender", y=1.05)
+    fig.tight_layout()
+    if len(sample) < len(df):
+        _annotate_points(fig, _sample_note(sample, df))
+    return fig
+
+@_with_data
+def plot_health_radar_chart(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (12, 8), ax, polar=True)
     categories = ['BMI', 'Daily_Steps', 'Hours_of_Sleep', 'Heart_Rate', 'Exercise_Hours_per_Week']
     df_std = df.copy()
     for cat in categories:
@@ -328,7 +626,6 @@ def plot_health_radar_chart():
     num_people = min(3, len(df))    
     angles = np.linspace(0, 2*np.pi, len(categories), endpoint=False).tolist()
     angles += angles[:1]   
-    ax = fig.add_subplot(111, polar=True)
     colors = ['blue', 'green', 'red']
     for i in range(num_people):
         values = df_std.loc[i, categories].values.flatten().tolist()
@@ -338,24 +635,24 @@ def plot_health_radar_chart():
     ax.set_xticks(angles[:-1])
     ax.set_xticklabels(categories)
     ax.set_title("Comparative Health Radar Chart")
-    plt.legend(loc='upper right')    
-    plt.tight_layout()
-    return fig
-
-def plot_risk_factors_sunburst():
-    df['BMI_Category'] = pd.cut(df['BMI'], 
-                               bins=[0, 18.5, 25, 30, 100], 
-                               labels=['Underweight', 'Normal', 'Overweight', 'Obese'])    
-    fig = plt.figure(figsize=(12, 12))    
-    grouped = df.groupby(['Gender', 'Smoker', 'BMI_Category']).size().reset_index(name='Count')    
-    colors = plt.cm.tab20.colors    
-    outer_vals = grouped.groupby('Gender')['Count'].sum()
+    ax.legend(loc='upper right')    
+    fig.tight_layout()
+    return fig
+
+@_with_data
+def plot_risk_factors_sunburst(df, fig=None, ax=None):
+    grouped = df.groupby(['Gender', 'Smoker', 'BMI_Category'], observed=True).size().reset_index(name='Count')    
+    return draw_risk_factors_sunburst(grouped, fig, ax)
+
+def draw_risk_factors_sunburst(grouped, fig=None, ax=None):
+    fig, ax = _figure(fig, (12, 12), ax)
+    colors = matplotlib.colormaps["tab20"].colors    
+    outer_vals = grouped.groupby('Gender', observed=True)['Count'].sum()
     outer_labels = outer_vals.index    
-    mid_vals = grouped.groupby(['Gender', 'Smoker'])['Count'].sum().values
-    mid_labels = [f"{g} - {s}" for g, s in grouped.groupby(['Gender', 'Smoker']).groups.keys()]    
+    mid_vals = grouped.groupby(['Gender', 'Smoker'], observed=True)['Count'].sum().values
+    mid_labels = [f"{g} - {s}" for g, s in grouped.groupby(['Gender', 'Smoker'], observed=True).groups.keys()]    
     inner_vals = grouped['Count'].values
     inner_labels = [f"{g} - {s} - {b}" for g, s, b in zip(grouped['Gender'], grouped['Smoker'], grouped['BMI_Category'])]    
-    ax = fig.add_subplot(111)    
     ax.pie(outer_vals, radius=1.3, labels=outer_labels, 
            colors=colors[:len(outer_vals)], 
            wedgeprops=dict(width=0.3, edgecolor='w'))    
@@ -366,25 +663,27 @@ def plot_risk_factors_sunburst():
            colors=colors[len(outer_vals)+len(mid_vals):], 
            wedgeprops=dict(width=0.3, edgecolor='w'))
     ax.set_title("Health Risk Factors Sunburst Chart", pad=20)
-    plt.legend(title="Categories", loc="center left", bbox_to_anchor=(1, 0.5))
-    plt.tight_layout()
+    ax.legend(title="Categories", loc="center left", bbox_to_anchor=(1, 0.5))
+    fig.tight_layout()
     return fig
 
-def plot_3d_health_analysis():
-    fig = plt.figure(figsize=(12, 10))
-    ax = fig.add_subplot(111, projection='3d')    
-    df['Systolic'] = df['Blood_Pressure'].apply(lambda x: int(x.split('/')[0]))    
+@_with_data
+def plot_3d_health_analysis(df, fig=None, ax=None):
+    fig, ax = _figure(fig, (12, 10), ax, projection='3d')
     colors = {'Male': 'blue', 'Female': 'red'}
-    genders = df['Gender'].unique()    
+    sample = stratified_sample(df, 'Gender')
+    if len(sample) < len(df):
+        _annotate_points(fig, _sample_note(sample, df))
+    genders = sample['Gender'].unique()    
     for gender in genders:
-        subset = df[df['Gender'] == gender]
+        subset = sample[sample['Gender'] == gender]
         ax.scatter(subset['Age'], subset['BMI'], subset['Heart_Rate'],
-                   c=subset['Gender'].map(colors), label=gender, s=100, alpha=0.7)    
+                   c=subset['Gender'].map(colors).astype(object).fillna('gray'), label=gender, s=100, alpha=0.7)    
     ax.set_xlabel('Age')
     ax.set_ylabel('BMI')
     ax.set_zlabel('Heart Rate')
     ax.set_title('3D Health Analysis: Age, BMI, and Heart Rate')    
     ax.legend()    
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 